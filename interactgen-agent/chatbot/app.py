@@ -3,23 +3,43 @@ FastAPI-based chatbot backend with WebSocket support.
 Provides real-time updates during automation execution.
 """
 import os
-import json
 import uuid
+import hashlib
+import re
 import asyncio
+import struct
 import base64
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.websockets import WebSocketState
+from websockets.exceptions import ConnectionClosed
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from playwright.async_api import async_playwright
 import sys
-# Add parent directory to path
+
+# Requires the project to be installed (pip install -e .)
+from src.scraper.fast_dom_extractor import extract_dom_fast, extract_node_ids, node_ids
+from src.planner.planner_agent import plan_next_step
+from src.executor.async_executor import execute_step_async, find_best_selector, select_by_text, warm_dom_index
+from src.utils.session_store import SessionState, SessionStore
+
+# SIMD base64 for decoding CDP screenshot payloads when available
+try:
+    import pybase64
+    _b64decode = pybase64.b64decode
+except ImportError:
+    _b64decode = base64.b64decode
+
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.append(parent_dir)
 
 # Load environment variables from .env file
 # Look for .env in the interactgen-agent directory (parent of chatbot/)
@@ -28,10 +48,59 @@ load_dotenv(dotenv_path=env_path)
 # Also try loading from current directory as fallback
 load_dotenv()
 
+# Environment is read once at import; restart the server to pick up changes
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+CHATBOT_PORT = int(os.getenv("CHATBOT_PORT", 5000))
+CHATBOT_HOST = os.getenv("CHATBOT_HOST", "localhost")
+# Visible by default so the user can watch; no slow_mo so Playwright can
+# pipeline CDP calls, with an optional pause only after user-visible actions
+HEADLESS = os.getenv("INTERACTGEN_HEADLESS", "0") != "0"
+STEP_DELAY_SEC = float(os.getenv("INTERACTGEN_STEP_DELAY", "0"))
+
 
 # Session storage
-sessions: Dict[str, Dict] = {}
-websockets: Dict[str, WebSocket] = {}
+MAX_SESSIONS = 10_000
+# Sessions idle this long are dropped; running automations touch theirs every step
+SESSION_TTL_SEC = 3600
+sessions = SessionStore(max_sessions=MAX_SESSIONS, ttl_sec=SESSION_TTL_SEC,
+                        on_evict=lambda sid, _: _evict_client(sid))
+# Each client gets a bounded outbound queue drained by its own sender task,
+# so a slow socket never blocks run_automation
+clients: Dict[str, Tuple[WebSocket, "UpdateCoalescer"]] = {}
+CLIENT_QUEUE_SIZE = 256
+# A client that can't accept a frame within this window is treated as dead
+CLIENT_SEND_TIMEOUT_SEC = 5.0
+# Updates sent within this window are merged into a single frame
+COALESCE_DELAY_SEC = 0.010
+
+
+# Finished contexts stay open for inspection, then close on a timer
+# (or early on a {"type": "close_browser"} WS message)
+BROWSER_HOLD_SEC = 30
+_held_contexts: Dict[str, Tuple[asyncio.TimerHandle, object]] = {}
+
+# Guards lazy launch of the Chromium instance shared by all sessions
+_browser_lock = asyncio.Lock()
+
+# orjson options for WebSocket payloads (step dicts may carry non-str keys)
+_ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+# Fixed frame envelopes; only the payload is encoded per message
+_UPDATE_PREFIX = b'{"type":"update","data":'
+_BATCH_PREFIX = b'{"type":"batch","updates":'
+_SESSION_DATA_PREFIX = b'{"type":"session_data","data":'
+_PONG_PREFIX = b'{"type":"pong","data":'
+_FRAME_SUFFIX = b'}'
+# Screenshot frames: 4-byte big-endian header length, JSON header, raw image.
+# JSON frames start with '{', which a header length under 16MiB never does.
+_HEADER_LEN = struct.Struct(">I")
+
+
+class ORJSONResponse(Response):
+    """JSON response encoded with orjson (FastAPI's own class is deprecated)."""
+    media_type = "application/json"
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=_ORJSON_OPTS)
 
 
 class ChatRequest(BaseModel):
@@ -44,17 +113,44 @@ class ChatResponse(BaseModel):
     message: str
 
 
-app = FastAPI(title="InteractGen Chatbot API")
+# Dedicated pool for blocking Groq calls so they don't compete with the
+# default executor used by Starlette for sync endpoints and file I/O
+LLM_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release the shared browser and worker pools on shutdown."""
+    app.state.playwright = None
+    app.state.browser = None
+    yield
+    if app.state.browser is not None:
+        await app.state.browser.close()
+    if app.state.playwright is not None:
+        await app.state.playwright.stop()
+    LLM_POOL.shutdown(wait=False, cancel_futures=True)
 
-# CORS middleware
+
+app = FastAPI(
+    title="InteractGen Chatbot API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# CORS middleware: the UI is same-origin, so only local dev origins are allowed.
+# No credentials and fixed methods/headers let Starlette precompute preflight responses.
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origin_regex=r"^https?://(localhost|127\.0\.0\.1)(:\d+)?$",
+    allow_credentials=False,
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type"],
 )
 
+# Failure screenshots are written by the executor into the working directory
+_SCREENSHOT_DIR = Path.cwd()
+_STEP_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
 # Mount static files
 static_path = Path(__file__).parent / "static"
 app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
@@ -71,31 +167,21 @@ async def chat(request: ChatRequest):
     """
     Start a new automation session.
     """
-    session_id = str(uuid.uuid4())
+    session_id = uuid.uuid4().hex
+    now = datetime.now().isoformat(timespec="milliseconds")
     
-    sessions[session_id] = {
-        "session_id": session_id,
-        "query": request.query,
-        "url": request.url,
-        "status": "pending",
-        "created_at": datetime.now().isoformat(),
-        "messages": [],
-        "steps": [],
-        "results": []
-    }
+    session = SessionState(
+        session_id=session_id,
+        query=request.query,
+        url=request.url,
+        created_at=now,
+    )
     
     # Add initial message
-    sessions[session_id]["messages"].append({
-        "role": "user",
-        "content": f"URL: {request.url}\nQuery: {request.query}",
-        "timestamp": datetime.now().isoformat()
-    })
+    session.add_message("user", f"URL: {request.url}\nQuery: {request.query}", now)
+    session.add_message("agent", f"Starting automation for: {request.query}", now)
     
-    sessions[session_id]["messages"].append({
-        "role": "agent",
-        "content": f"Starting automation for: {request.query}",
-        "timestamp": datetime.now().isoformat()
-    })
+    sessions.put(session_id, session)
     
     # Start automation in background
     asyncio.create_task(run_automation(session_id))
@@ -112,57 +198,285 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     WebSocket endpoint for real-time updates.
     """
     await websocket.accept()
-    websockets[session_id] = websocket
+    queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+    sender = asyncio.create_task(_sender_loop(session_id, websocket, queue))
+    coalescer = UpdateCoalescer(queue)
+    clients[session_id] = (websocket, coalescer)
     
     # Send initial session data
-    if session_id in sessions:
-        await websocket.send_json({
-            "type": "session_data",
-            "data": sessions[session_id]
-        })
+    session = sessions.get(session_id)
+    if session is not None:
+        _enqueue(queue, _SESSION_DATA_PREFIX + session.to_json() + _FRAME_SUFFIX)
     
     try:
         while True:
             # Keep connection alive
             data = await websocket.receive_text()
-            # Echo back (could handle commands here)
-            await websocket.send_json({"type": "pong", "data": data})
+            if data.startswith('{'):
+                try:
+                    command = orjson.loads(data)
+                except orjson.JSONDecodeError:
+                    command = None
+                if isinstance(command, dict) and command.get("type") == "close_browser":
+                    _release_context(session_id)
+                    continue
+            # Echo back
+            _enqueue(queue, _PONG_PREFIX + orjson.dumps(data) + _FRAME_SUFFIX)
     
     except WebSocketDisconnect:
-        if session_id in websockets:
-            del websockets[session_id]
+        pass
+    finally:
+        # Also reached on RuntimeError/ConnectionClosed, e.g. once the
+        # sender loop has closed the socket after a send timeout
+        sender.cancel()
+        _drop_client(session_id, websocket)
 
 
 @app.get("/api/sessions/{session_id}")
 async def get_session(session_id: str):
     """Get session data."""
-    if session_id not in sessions:
+    session = sessions.get(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    return JSONResponse(sessions[session_id])
+    # Steps and results are pre-encoded, so this is a byte join, not a re-serialization
+    return Response(session.to_json(), media_type="application/json")
 
 
 @app.get("/api/screenshot/{session_id}/{step_id}")
 async def get_screenshot(session_id: str, step_id: str):
     """Get screenshot for a step."""
-    screenshot_path = Path(f"fail_{step_id}.png")
-    
-    if not screenshot_path.exists():
+    # Reject anything that could escape the screenshot directory
+    if not _STEP_ID_RE.match(step_id):
         raise HTTPException(status_code=404, detail="Screenshot not found")
     
-    return FileResponse(screenshot_path)
+    # Failure shots are JPEG; older runs left PNGs behind
+    for ext in ("jpg", "png"):
+        screenshot_path = _SCREENSHOT_DIR / f"fail_{step_id}.{ext}"
+        try:
+            st = screenshot_path.stat()
+        except FileNotFoundError:
+            continue
+        # Pass the stat result through so Starlette doesn't stat the file again
+        return FileResponse(screenshot_path, stat_result=st)
+    raise HTTPException(status_code=404, detail="Screenshot not found")
 
 
-async def send_update(session_id: str, update: Dict):
-    """Send update to WebSocket client."""
-    if session_id in websockets:
+def _drop_client(session_id: str, websocket: WebSocket):
+    """Deregister a client unless it was already replaced by a reconnect."""
+    client = clients.get(session_id)
+    if client and client[0] is websocket:
+        client[1].cancel()
+        del clients[session_id]
+
+
+def _evict_client(session_id: str):
+    """Disconnect the client of a session that was evicted from the store."""
+    client = clients.get(session_id)
+    if client is None:
+        return
+    websocket = client[0]
+    _drop_client(session_id, websocket)
+    try:
+        asyncio.get_running_loop().create_task(websocket.close())
+    except RuntimeError:
+        pass
+
+
+async def _safe_close(context):
+    """Close a browser context, ignoring errors from an already-closed one."""
+    try:
+        await context.close()
+    except Exception:
+        pass
+
+
+def _hold_context(session_id: str, context):
+    """Keep a finished session's context open, closing it after BROWSER_HOLD_SEC."""
+    loop = asyncio.get_running_loop()
+    handle = loop.call_later(BROWSER_HOLD_SEC, _release_context, session_id)
+    _held_contexts[session_id] = (handle, context)
+
+
+def _release_context(session_id: str):
+    """Close a held context now, cancelling its timer."""
+    held = _held_contexts.pop(session_id, None)
+    if held is None:
+        return
+    handle, context = held
+    handle.cancel()
+    asyncio.get_running_loop().create_task(_safe_close(context))
+
+
+async def get_browser(headless: bool):
+    """Return the shared Chromium instance, launching it on first use."""
+    async with _browser_lock:
+        if app.state.playwright is None:
+            app.state.playwright = await async_playwright().start()
+        browser = app.state.browser
+        if browser is None or not browser.is_connected():
+            print("Launching shared browser...")
+            browser = await app.state.playwright.chromium.launch(headless=headless)
+            app.state.browser = browser
+        return browser
+
+
+async def start_screencast(cdp) -> Dict:
+    """
+    Start a CDP screencast and return a dict holding the latest frame.
+    
+    Chromium pushes JPEG frames as the page repaints, so reading the most
+    recent one costs nothing compared with a synchronous capture.
+    """
+    latest_frame: Dict = {}
+    # Strong references to in-flight acks so they can't be collected mid-send
+    acks = set()
+    
+    def on_ack_done(task: asyncio.Task):
+        acks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"  Screencast ack failed: {task.exception()!r}")
+    
+    def on_frame(params: Dict):
+        latest_frame['data'] = params['data']
+        task = asyncio.create_task(cdp.send('Page.screencastFrameAck', {'sessionId': params['sessionId']}))
+        acks.add(task)
+        task.add_done_callback(on_ack_done)
+    
+    cdp.on('Page.screencastFrame', on_frame)
+    await cdp.send('Page.startScreencast', {'format': 'jpeg', 'quality': 60, 'everyNthFrame': 3})
+    return latest_frame
+
+
+async def capture_screenshot(page, cdp, quality: int, frames: Optional[Dict] = None) -> Tuple[bytes, str]:
+    """
+    Get the viewport as raw image bytes, preferring the latest screencast frame.
+    
+    Without a frame, captures WebP through the page's CDP session (Playwright's
+    page.screenshot() has no WebP option), falling back to JPEG.
+    
+    Returns:
+        (image bytes, MIME type)
+    """
+    if frames and 'data' in frames:
+        return _b64decode(frames['data']), 'image/jpeg'
+    if cdp is not None:
         try:
-            await websockets[session_id].send_json({
-                "type": "update",
-                "data": update
+            res = await cdp.send('Page.captureScreenshot', {
+                'format': 'webp',
+                'quality': quality,
+                'optimizeForSpeed': True
             })
-        except:
+            return _b64decode(res['data']), 'image/webp'
+        except Exception as e:
+            print(f"CDP screenshot failed, using page.screenshot: {e}")
+    return await page.screenshot(type='jpeg', quality=quality), 'image/jpeg'
+
+
+async def capture_and_send(page, cdp, session_id: str, step: int,
+                           message: Optional[str] = None, frames: Optional[Dict] = None):
+    """Capture a screenshot and push it to the client as a binary frame; never raises."""
+    try:
+        image, mime = await capture_screenshot(page, cdp, quality=70, frames=frames)
+        update = {
+            "status": "screenshot",
+            "step": step,
+            "mime": mime,
+            "url": page.url
+        }
+        if message:
+            update["message"] = message
+        header = _UPDATE_PREFIX + orjson.dumps(update) + _FRAME_SUFFIX
+        send_frame(session_id, _HEADER_LEN.pack(len(header)) + header + image)
+    except Exception as e:
+        print(f"  [{session_id}] Screenshot error: {e}")
+
+
+async def _sender_loop(session_id: str, websocket: WebSocket, queue: asyncio.Queue):
+    """Drain a client's outbound queue onto its WebSocket."""
+    try:
+        while True:
+            payload = await queue.get()
+            await asyncio.wait_for(websocket.send_bytes(payload), timeout=CLIENT_SEND_TIMEOUT_SEC)
+    except asyncio.TimeoutError:
+        print(f"  [{session_id}] WebSocket send timed out, dropping client")
+        _drop_client(session_id, websocket)
+        try:
+            await websocket.close()
+        except Exception:
             pass
+    except (WebSocketDisconnect, ConnectionClosed, RuntimeError) as e:
+        print(f"  [{session_id}] WebSocket closed: {e!r}")
+        _drop_client(session_id, websocket)
+
+
+def _enqueue(queue: asyncio.Queue, payload: bytes):
+    """Queue a frame without blocking, dropping the oldest one if full."""
+    try:
+        queue.put_nowait(payload)
+    except asyncio.QueueFull:
+        queue.get_nowait()
+        queue.put_nowait(payload)
+
+
+class UpdateCoalescer:
+    """Merges updates emitted close together into one WebSocket frame."""
+    
+    def __init__(self, queue: asyncio.Queue, delay: float = COALESCE_DELAY_SEC):
+        self.queue = queue
+        self.delay = delay
+        self.pending: List[Dict] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+    
+    def add(self, update: Dict):
+        """Buffer an update and schedule a flush if none is pending."""
+        self.pending.append(update)
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.delay, self.flush)
+    
+    def flush(self):
+        """Encode buffered updates once and hand them to the sender queue."""
+        self._timer = None
+        updates, self.pending = self.pending, []
+        if not updates:
+            return
+        # Encode once to bytes; avoids send_json's stdlib json.dumps per update
+        if len(updates) == 1:
+            prefix, payload = _UPDATE_PREFIX, updates[0]
+        else:
+            prefix, payload = _BATCH_PREFIX, updates
+        _enqueue(self.queue, prefix + orjson.dumps(payload, option=_ORJSON_OPTS) + _FRAME_SUFFIX)
+    
+    def cancel(self):
+        """Drop any pending flush."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.pending = []
+
+
+def send_frame(session_id: str, payload: bytes):
+    """Queue a pre-encoded frame, after any updates still being coalesced."""
+    client = clients.get(session_id)
+    if client is None:
+        return
+    websocket, coalescer = client
+    if websocket.client_state != WebSocketState.CONNECTED:
+        _drop_client(session_id, websocket)
+        return
+    coalescer.flush()
+    _enqueue(coalescer.queue, payload)
+
+
+async def send_update(session_id: str, update: Dict):
+    """Send update to WebSocket client."""
+    client = clients.get(session_id)
+    if client:
+        websocket, coalescer = client
+        if websocket.client_state != WebSocketState.CONNECTED:
+            _drop_client(session_id, websocket)
+            return
+        coalescer.add(update)
 
 
 async def run_automation(session_id: str):
@@ -174,16 +488,17 @@ async def run_automation(session_id: str):
     2. Loop: Fast DOM scrape → Plan ONE step → Highlight → Execute → Repeat
     3. User sees every action happening live
     """
-    session = sessions[session_id]
-    query = session["query"]
-    url = session["url"]
+    session = sessions.get(session_id)
+    if session is None:
+        return
+    query = session.query
+    url = session.url
     
-    # Get API key early and validate
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
+    # Validate API key early
+    if not GROQ_API_KEY:
         print(f"❌ [{session_id}] GROQ_API_KEY missing!")
-        session["status"] = "failed"
-        session["error"] = "GROQ_API_KEY not set. Please set it in .env file or environment variable."
+        session.status = "failed"
+        session.error = "GROQ_API_KEY not set. Please set it in .env file or environment variable."
         await send_update(session_id, {
             "status": "failed",
             "message": "❌ Error: GROQ_API_KEY not found. Please set it in .env file or environment variable."
@@ -192,29 +507,23 @@ async def run_automation(session_id: str):
     
     try:
         print(f"🚀 [{session_id}] Starting automation for: {url}")
-        session["status"] = "running"
+        session.status = "running"
         await send_update(session_id, {
             "status": "starting", 
-            "message": "🚀 Launching browser (visible mode)..."
+            "message": f"🚀 Launching browser ({'headless' if HEADLESS else 'visible'} mode)..."
         })
         
-        # Import NEW fast components
-        from src.scraper.fast_dom_extractor import extract_dom_fast, highlight_element, remove_highlight
-        from src.planner.planner_agent import plan_next_step
-        from src.executor.async_executor import execute_step_async, find_best_selector
-        from playwright.async_api import async_playwright
-        
-        async with async_playwright() as p:
-            print(f"  [{session_id}] Launching browser...")
-            # Launch VISIBLE browser so user can interact if needed
-            browser = await p.chromium.launch(
-                headless=False,  # Visible browser for user interaction
-                slow_mo=200  # 0.2s delay - much faster but still visible
-            )
-            page = await browser.new_page()
-            
-            # Set viewport size
-            await page.set_viewport_size({"width": 1280, "height": 800})
+        # Shared browser; each session gets its own isolated context
+        browser = await get_browser(HEADLESS)
+        context = await browser.new_context(viewport={"width": 1280, "height": 800})
+        try:
+            page = await context.new_page()
+            # One CDP session per page, reused for screenshots and DOM extraction
+            try:
+                cdp = await context.new_cdp_session(page)
+            except Exception:
+                cdp = None
+            frames = None
             
             # Navigate to URL
             print(f"  [{session_id}] Navigating to {url}...")
@@ -224,12 +533,8 @@ async def run_automation(session_id: str):
             })
             
             try:
+                # <body> is guaranteed once domcontentloaded fires
                 await page.goto(url, wait_until='domcontentloaded', timeout=45000)
-                # Wait for at least some content to render
-                try:
-                    await page.wait_for_selector('body', timeout=5000)
-                except:
-                    pass
             except Exception as e:
                 print(f"  [{session_id}] Navigation warning: {e}")
                 await send_update(session_id, {
@@ -239,18 +544,17 @@ async def run_automation(session_id: str):
             
             await asyncio.sleep(0.5)  # Minimal wait for page stability
             
-            # Send initial screenshot
-            try:
-                screenshot_bytes = await page.screenshot(type='jpeg', quality=75)
-                screenshot_b64 = base64.b64encode(screenshot_bytes).decode('utf-8')
-                await send_update(session_id, {
-                    "status": "screenshot",
-                    "screenshot": screenshot_b64,
-                    "url": page.url,
-                    "message": "Page loaded"
-                })
-            except Exception as e:
-                print(f"Screenshot error: {e}")
+            # Send initial screenshot, then let the screencast supply later frames
+            await capture_and_send(page, cdp, session_id, 0, "Page loaded")
+            if cdp is not None:
+                try:
+                    frames = await start_screencast(cdp)
+                except Exception as e:
+                    print(f"  [{session_id}] Screencast unavailable: {e}")
+            
+            # Per-step screenshots run in the background, overlapping the
+            # next DOM extraction and LLM planning call
+            pending_screenshots = set()
             
             executed_steps = []
             max_steps = 20  # Increased limit
@@ -259,10 +563,16 @@ async def run_automation(session_id: str):
             max_consecutive_failures = 5  # Stop if 5 steps fail in a row
             seen_actions = []  # Track recent actions to detect loops
             last_url = url  # Track URL changes
+            evicted = False
             
             print(f"  [{session_id}] Starting loop...")
             while step_count < max_steps:
                 step_count += 1
+                if not sessions.touch(session_id):
+                    # Evicted or expired mid-run; nothing is attached to it any more
+                    print(f"  [{session_id}] Session evicted, stopping")
+                    evicted = True
+                    break
                 print(f"  [{session_id}] Step {step_count}: Analyzing...")
                 
                 # === STEP 1: Fast DOM Extraction (~50-100ms) ===
@@ -272,7 +582,7 @@ async def run_automation(session_id: str):
                         "message": f"🔍 Analyzing page..."
                     })
                 
-                current_dom = await extract_dom_fast(page)
+                current_dom = await extract_dom_fast(page, cdp)
                 # DO NOT filter nodes here - let the planner handle selection
                 # We need to pass the FULL DOM to the planner so it can find things
                 
@@ -287,16 +597,18 @@ async def run_automation(session_id: str):
                 print(f"  [{session_id}] Planning next step...")
                 # Run LLM in thread pool (it's synchronous)
                 # Pass API key explicitly to ensure it's available in the executor thread
-                loop = asyncio.get_event_loop()
+                loop = asyncio.get_running_loop()
+                # Index the snapshot for selector lookup while the planner call is in flight
+                loop.call_soon(warm_dom_index, current_dom)
                 try:
                     next_step = await loop.run_in_executor(
-                        None, 
+                        LLM_POOL, 
                         plan_next_step, 
                         query, 
                         page.url,  # Use current URL (may have changed)
                         current_dom, 
                         executed_steps,
-                        api_key  # Explicitly pass API key
+                        GROQ_API_KEY  # Explicitly pass API key
                     )
                 except Exception as e:
                     error_str = str(e).lower()
@@ -338,12 +650,10 @@ async def run_automation(session_id: str):
                 
 
                 # === Loop Detection & State Tracking ===
-                import hashlib
-                
                 # Create a hash of the current state (based on nodes)
                 # We use node IDs which are already content-stable
-                node_ids = "".join(sorted([n.get('node_id', '') for n in current_dom.get('nodes', [])]))
-                state_hash = hashlib.md5(node_ids.encode()).hexdigest()[:8]
+                state_ids = "".join(sorted(node_ids(current_dom)))
+                state_hash = hashlib.md5(state_ids.encode()).hexdigest()[:8]
                 
                 # Check for repetition of (State + Action)
                 action_type = next_step.get('action')
@@ -388,9 +698,6 @@ async def run_automation(session_id: str):
                 # Instead, wait actions are now properly executed and tracked
 
                 
-                # Store step info (skip verbose status update for speed)
-                session["steps"].append(next_step)
-                
                 # === STEP 3: Find Selector and Execute ===
                 target = next_step.get('target', '')
                 action = next_step.get('action', '')
@@ -400,18 +707,7 @@ async def run_automation(session_id: str):
                 
                 # If no selector found, try to find by text/aria more aggressively
                 if not selector and target:
-                    for node in current_dom.get('nodes', []):
-                        node_text = (node.get('text') or '').lower()
-                        node_aria = (node.get('aria_label') or '').lower()
-                        target_lower = target.lower()
-                        if target_lower in node_text or target_lower in node_aria or node_text in target_lower:
-                            candidates = node.get('candidates', [])
-                            if candidates:
-                                selector = candidates[0].get('value')
-                                break
-                            elif node.get('xpath'):
-                                selector = node.get('xpath')
-                                break
+                    selector = select_by_text(target, current_dom)
                 
                 # Update step with selector for better execution
                 if selector:
@@ -420,6 +716,9 @@ async def run_automation(session_id: str):
                 else:
                     log_msg = f"⚡ {action} '{target[:30]}' (no selector found)"
                 
+                # Store step info once it carries its selector (encoded on append)
+                session.add_step(next_step)
+                
                 print(f"  [{session_id}] Executing: {log_msg}")
                 await send_update(session_id, {
                     "status": "executing",
@@ -428,6 +727,8 @@ async def run_automation(session_id: str):
                 })
                 
                 result = await execute_step_async(page, next_step, current_dom)
+                if STEP_DELAY_SEC and action in ('click', 'type'):
+                    await asyncio.sleep(STEP_DELAY_SEC)
                 
                 # === RETROACTIVE NO-OP DETECTION ===
                 # Check if state changed after execution
@@ -441,8 +742,8 @@ async def run_automation(session_id: str):
                 # Optimization: Only do this for 'click' or 'type' actions that result in success
                 if result.get('ok') and action in ['click', 'type', 'submit']:
                     try:
-                        new_dom = await extract_dom_fast(page)
-                        new_node_ids = "".join(sorted([n.get('node_id', '') for n in new_dom.get('nodes', [])]))
+                        # Only the IDs are needed, so only they cross CDP
+                        new_node_ids = "".join(sorted(await extract_node_ids(page, cdp)))
                         new_hash = hashlib.md5(new_node_ids.encode()).hexdigest()[:8]
                         
                         if new_hash == state_hash:
@@ -454,7 +755,7 @@ async def run_automation(session_id: str):
                 
                 # Record result
                 executed_steps.append({"step": next_step, "result": result})
-                session["results"].append(result)
+                session.add_result(result)
                 
                 if result.get('ok'):
                     print(f"  [{session_id}] Step success")
@@ -500,16 +801,9 @@ async def run_automation(session_id: str):
                 
                 # Send screenshot only every 3rd step or on failures (reduce latency)
                 if step_count % 3 == 0 or not result.get('ok'):
-                    try:
-                        screenshot_bytes = await page.screenshot(type='jpeg', quality=60)
-                        screenshot_b64 = base64.b64encode(screenshot_bytes).decode('utf-8')
-                        await send_update(session_id, {
-                            "status": "screenshot",
-                            "screenshot": screenshot_b64,
-                            "url": page.url
-                        })
-                    except:
-                        pass  # Don't block on screenshot errors
+                    task = asyncio.create_task(capture_and_send(page, cdp, session_id, step_count, frames=frames))
+                    pending_screenshots.add(task)
+                    task.add_done_callback(pending_screenshots.discard)
                 
                 # Minimal pause for speed
                 await asyncio.sleep(0.1)
@@ -517,22 +811,29 @@ async def run_automation(session_id: str):
                 # Debug: Confirm we reached end of loop iteration
                 print(f"  [{session_id}] === End of step {step_count}, continuing to next iteration ===")
             
+            await asyncio.gather(*pending_screenshots, return_exceptions=True)
+            
+            if evicted:
+                # Close the context now (finally below) rather than holding it
+                _release_context(session_id)
+                return
+            
             # Don't close browser immediately - keep it open for user to see
             # User can close it manually or we'll close it after a delay
             await send_update(session_id, {
                 "status": "browser_open",
-                "message": "🌐 Browser kept open for inspection. It will close automatically in 30 seconds."
+                "message": f"🌐 Browser kept open for inspection. It will close automatically in {BROWSER_HOLD_SEC} seconds."
             })
             
-            # Keep browser open for 30 seconds, then close
-            await asyncio.sleep(30)
-            try:
-                await browser.close()
-            except:
-                pass
+            # Close on a timer instead of pinning this task for the hold period
+            _hold_context(session_id, context)
+            context = None
+        finally:
+            if context is not None:
+                await _safe_close(context)
         
         # Final summary
-        session["status"] = "completed"
+        session.status = "completed"
         total = len(executed_steps)
         passed = sum(1 for s in executed_steps if s.get('result', {}).get('ok'))
         
@@ -545,8 +846,8 @@ async def run_automation(session_id: str):
     except Exception as e:
         import traceback
         traceback.print_exc()
-        session["status"] = "failed"
-        session["error"] = str(e)
+        session.status = "failed"
+        session.error = str(e)
         print(f"❌ [{session_id}] Fatal Error: {e}")
         await send_update(session_id, {
             "status": "failed",
@@ -557,12 +858,8 @@ async def run_automation(session_id: str):
 if __name__ == "__main__":
     import uvicorn
     
-    port = int(os.getenv("CHATBOT_PORT", 5000))
-    host = os.getenv("CHATBOT_HOST", "localhost")
-    
     # Validate API key is available
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
+    if not GROQ_API_KEY:
         print("=" * 60)
         print("❌ ERROR: GROQ_API_KEY not found!")
         print("=" * 60)
@@ -576,7 +873,10 @@ if __name__ == "__main__":
         print("=" * 60)
         exit(1)
     
-    print(f"Starting InteractGen Chatbot on http://{host}:{port}")
-    print(f"✓ GROQ_API_KEY found (starts with: {api_key[:10]}...)")
+    print(f"Starting InteractGen Chatbot on http://{CHATBOT_HOST}:{CHATBOT_PORT}")
+    print(f"✓ GROQ_API_KEY found (starts with: {GROQ_API_KEY[:10]}...)")
     
-    uvicorn.run(app, host=host, port=port)
+    # uvloop and httptools ship with uvicorn[standard]; uvloop has no Windows build
+    loop_impl = "asyncio" if sys.platform == "win32" else "uvloop"
+    # Keep a single worker process: sessions and WebSocket clients live in memory
+    uvicorn.run(app, host=CHATBOT_HOST, port=CHATBOT_PORT, loop=loop_impl, http="httptools", ws="websockets")
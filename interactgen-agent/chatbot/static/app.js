@@ -3,6 +3,8 @@
 let ws = null;
 let currentSessionId = null;
 let currentUrl = '';
+const textDecoder = new TextDecoder();
+let screenshotUrl = null;  // object URL of the screenshot on display
 
 // DOM Elements
 const urlInput = document.getElementById('url-input');
@@ -104,11 +106,26 @@ function connectWebSocket(sessionId) {
 
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
     ws = new WebSocket(`${protocol}//${window.location.host}/api/ws/${sessionId}`);
+    // Server sends pre-encoded JSON as binary frames
+    ws.binaryType = 'arraybuffer';
 
     ws.onopen = () => console.log('WebSocket connected');
 
     ws.onmessage = (event) => {
-        const message = JSON.parse(event.data);
+        if (typeof event.data === 'string') {
+            handleUpdate(JSON.parse(event.data));
+            return;
+        }
+        const bytes = new Uint8Array(event.data);
+        if (bytes[0] === 0x7b) {  // '{': plain JSON frame
+            handleUpdate(JSON.parse(textDecoder.decode(bytes)));
+            return;
+        }
+        // Screenshot frame: 4-byte header length, JSON header, raw image bytes
+        const headerLen = new DataView(event.data).getUint32(0);
+        const message = JSON.parse(textDecoder.decode(bytes.subarray(4, 4 + headerLen)));
+        const image = new Blob([bytes.subarray(4 + headerLen)], { type: message.data.mime });
+        message.data.screenshot_blob = image;
         handleUpdate(message);
     };
 
@@ -126,14 +143,24 @@ function handleUpdate(message) {
         return;
     }
 
+    if (message.type === 'batch') {
+        // Several updates coalesced into one frame by the server
+        message.updates.forEach(data => handleUpdate({ type: 'update', data }));
+        return;
+    }
+
     if (message.type !== 'update') return;
 
     const update = message.data;
     const status = update.status;
 
     // Handle screenshots
-    if (status === 'screenshot' && update.screenshot) {
-        browserScreenshot.src = 'data:image/png;base64,' + update.screenshot;
+    if (status === 'screenshot' && (update.screenshot_blob || update.screenshot)) {
+        // Live screenshots arrive as binary frames; inline base64 is still accepted
+        if (screenshotUrl) URL.revokeObjectURL(screenshotUrl);
+        screenshotUrl = update.screenshot_blob ? URL.createObjectURL(update.screenshot_blob) : null;
+        browserScreenshot.src = screenshotUrl
+            || `data:${update.mime || 'image/jpeg'};base64,` + update.screenshot;
         browserScreenshot.style.display = 'block';
         browserIframe.style.display = 'none';
         browserOverlay.classList.add('hidden');
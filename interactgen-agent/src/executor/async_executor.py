@@ -3,7 +3,293 @@ Async executor for real-time step execution.
 Works with already-open Playwright async pages.
 """
 import asyncio
-from typing import Dict, List, Any, Optional
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from src.utils.js_helpers import JS_HELPERS
+
+
+CLICK_JS = "(sel) => window.__ig_click(sel)"
+FILL_JS = "([sel, val]) => window.__ig_fill(sel, val)"
+
+
+async def _ensure_helpers(page):
+    """Install JS_HELPERS on a page once; later documents get them via init script."""
+    if getattr(page, '_ig_helpers_installed', False):
+        return
+    await page.add_init_script(JS_HELPERS)
+    await page.evaluate(JS_HELPERS)
+    page._ig_helpers_installed = True
+
+
+# Playwright timeout for a single click/fill attempt
+ACTION_TIMEOUT_MS = 2000
+# Used once a concurrent probe found none of the candidates visible
+SHORT_ACTION_TIMEOUT_MS = 250
+# Pre-flight actionability check before a real click/fill
+PREFLIGHT_TIMEOUT_MS = 250
+
+# Per-snapshot _DOMIndex, keyed by id(dom); the index holds the dom itself
+# so the id stays valid while cached.
+_DOM_INDEX_CACHE: "OrderedDict[int, _DOMIndex]" = OrderedDict()
+_DOM_INDEX_CACHE_SIZE = 4
+
+
+@lru_cache(maxsize=256)
+def _tok(target: str) -> Tuple[str, FrozenSet[str]]:
+    """Lowered target and its word set."""
+    lower = target.lower()
+    return lower, frozenset(lower.split())
+
+
+class _DOMIndex:
+    """
+    Lowercased node fields as parallel lists, plus a node_id -> node map.
+    
+    Selector lookups run several times against the same snapshot, so the
+    per-node dict lookups, lowercasing and word splitting happen once here
+    and the scoring loops just zip flat lists of strings.
+    """
+    __slots__ = ('dom', 'nodes', 'texts', 'arias', 'names', 'words', 'by_id', 'selectors')
+    
+    def __init__(self, dom: Dict):
+        self.dom = dom
+        self.nodes = dom.get('nodes', [])
+        self.texts = texts = []
+        self.arias = arias = []
+        self.names = names = []
+        self.words = words = []
+        self.by_id = by_id = {}
+        # find_best_selector results for this snapshot, keyed by target
+        self.selectors: Dict[str, Optional[str]] = {}
+        for node in self.nodes:
+            text = (node.get('text') or '').lower()
+            aria = (node.get('aria_label') or '').lower()
+            name = ((node.get('attributes') or {}).get('name') or '').lower()
+            texts.append(text)
+            arias.append(aria)
+            names.append(name)
+            words.append(frozenset(f"{text} {aria} {name}".split()))
+            node_id = node.get('node_id')
+            if node_id:
+                # First node wins, matching the old linear scan
+                by_id.setdefault(node_id, node)
+
+
+def _index_dom(dom: Dict) -> _DOMIndex:
+    """Build or fetch the cached index for a DOM snapshot."""
+    key = id(dom)
+    index = _DOM_INDEX_CACHE.get(key)
+    if index is not None and index.dom is dom:
+        _DOM_INDEX_CACHE.move_to_end(key)
+        return index
+    
+    index = _DOMIndex(dom)
+    _DOM_INDEX_CACHE[key] = index
+    while len(_DOM_INDEX_CACHE) > _DOM_INDEX_CACHE_SIZE:
+        _DOM_INDEX_CACHE.popitem(last=False)
+    return index
+
+
+def warm_dom_index(dom: Dict):
+    """
+    Build a snapshot's index ahead of its first selector lookup.
+    
+    Meant to be scheduled with loop.call_soon while the loop is otherwise
+    idle, e.g. while the planner call runs in a worker thread.
+    """
+    _index_dom(dom)
+
+
+def _node_by_id(dom: Dict) -> Dict[str, Dict]:
+    """Return the node_id -> node map for a DOM."""
+    return _index_dom(dom).by_id
+
+
+async def _first_visible(page, selectors: List, timeout_ms: int = ACTION_TIMEOUT_MS) -> Optional[int]:
+    """
+    Wait for all selectors to become visible concurrently.
+    
+    Returns the index of the highest-priority selector that did, or None.
+    A lower-priority hit only wins once every selector ahead of it has
+    failed, so the total wait is one timeout rather than one per selector.
+    """
+    tasks = [
+        asyncio.create_task(
+            (page.locator(sel).first if isinstance(sel, str) else sel)
+            .wait_for(state='visible', timeout=timeout_ms)
+        )
+        for sel in selectors
+    ]
+    try:
+        pending = set(tasks)
+        while pending:
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for idx, task in enumerate(tasks):
+                if not task.done():
+                    break  # A better selector is still being probed
+                if not task.cancelled() and task.exception() is None:
+                    return idx
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _text_locator(page, target: str):
+    """Locator matching the target by visible text, button name or label."""
+    return (page.get_by_text(target, exact=False)
+            .or_(page.get_by_role("button", name=target))
+            .or_(page.get_by_label(target)))
+
+
+# Candidates are selector strings, or Locators (node XPaths, _text_locator)
+def _as_locator(page, target):
+    return page.locator(target).first if isinstance(target, str) else target
+
+
+async def _fill(page, target, value: str, timeout: int, preflight: bool = True):
+    locator = _as_locator(page, target)
+    if preflight:
+        await locator.wait_for(state='attached', timeout=PREFLIGHT_TIMEOUT_MS)
+    await locator.fill(value, timeout=timeout)
+
+
+async def _js_click(page, target) -> bool:
+    if not isinstance(target, str):
+        # Fail fast if the node is gone instead of waiting Playwright's default
+        return await target.evaluate("el => { el.click(); return true; }",
+                                     timeout=PREFLIGHT_TIMEOUT_MS)
+    await _ensure_helpers(page)
+    return await page.evaluate(CLICK_JS, target)
+
+
+async def _js_fill(page, target, value: str) -> bool:
+    await _ensure_helpers(page)
+    if not isinstance(target, str):
+        return await target.evaluate("(el, val) => window.__ig_fill_el(el, val)", value,
+                                     timeout=PREFLIGHT_TIMEOUT_MS)
+    return await page.evaluate(FILL_JS, [target, value])
+
+
+async def _do_scroll(page, target: str, value: str, result: Dict):
+    direction = value.lower() if value else 'down'
+    amount = 500 if direction == 'down' else -500
+    await page.evaluate(f"window.scrollBy(0, {amount})")
+    result['ok'] = True
+    result['message'] = f"Scrolled {direction}"
+
+
+async def _do_navigate(page, target: str, value: str, result: Dict):
+    await page.goto(target, timeout=15000)
+    result['ok'] = True
+    result['message'] = f"Navigated to: {target}"
+
+
+async def _do_wait(page, target: str, value: str, result: Dict):
+    await asyncio.sleep(1)
+    result['ok'] = True
+    result['message'] = "Waited 1 second"
+
+
+async def _do_click(page, selector, target: str, value: str, result: Dict, timeout: int,
+                    preflight: bool = True) -> Optional[str]:
+    """
+    Click one candidate; returns None on success or an error message.
+    
+    With preflight, a trial click checks actionability first, so a bad
+    candidate fails in PREFLIGHT_TIMEOUT_MS and the next one is tried.
+    Without it (the last candidate, or one already seen visible) the real
+    click gets the full timeout and falls back to a JS click.
+    """
+    locator = _as_locator(page, selector)
+    if preflight:
+        try:
+            # Forcing a JS click after this fails would bypass exactly the
+            # check that just failed, so move on to the next candidate
+            await locator.click(trial=True, timeout=PREFLIGHT_TIMEOUT_MS)
+        except Exception as e:
+            return f"Not clickable with {selector}: {str(e)}"
+    try:
+        await locator.click(timeout=timeout)
+        result['ok'] = True
+        result['message'] = f"Clicked: {target}"
+        return None
+    except Exception:
+        # No better candidate is left to try, so fall back to a JS click
+        try:
+            if await _js_click(page, selector):
+                result['ok'] = True
+                result['message'] = f"Clicked (JS): {target}"
+                return None
+            return f"JS Click found no element for {selector}"
+        except Exception as e2:
+            return f"Click failed with {selector}: {str(e2)}"
+
+
+async def _do_type(page, selector, target: str, value: str, result: Dict, timeout: int,
+                   preflight: bool = True) -> Optional[str]:
+    """Fill one candidate; returns None on success or an error message."""
+    try:
+        # Try efficient fill first
+        await _fill(page, selector, value, timeout, preflight)
+        result['ok'] = True
+        result['message'] = f"Typed '{value}' into: {target}"
+        
+        # Auto-press Enter for search fields
+        if 'search' in target.lower() or 'query' in target.lower():
+            try:
+                await page.keyboard.press('Enter')
+                result['message'] += " + Pressed Enter"
+            except Exception:
+                pass
+        return None
+    except Exception:
+        # Fallback to JS type
+        if await _js_fill(page, selector, value):
+            result['ok'] = True
+            result['message'] = f"Typed (JS) '{value}' into: {target}"
+            return None
+        return f"JS Type failed with {selector}"
+
+
+# Actions on the page itself vs. actions on a resolved element
+PAGE_ACTIONS = {
+    'scroll': _do_scroll,
+    'navigate': _do_navigate,
+    'wait': _do_wait,
+}
+ELEMENT_ACTIONS = {
+    'click': _do_click,
+    'type': _do_type,
+}
+
+
+async def _attempt_with_candidates(handler, page, candidates: List, target: str,
+                                   value: str, result: Dict, timeout: int,
+                                   first_visible: bool = False) -> str:
+    """
+    Run an element handler over candidates until one succeeds; returns the last error.
+    
+    The pre-flight check is skipped for the last candidate, which has nothing
+    to fall through to, and for the first one when first_visible says a probe
+    already saw it.
+    """
+    last_error = ""
+    last = len(candidates) - 1
+    for idx, selector in enumerate(candidates):
+        preflight = idx != last and not (idx == 0 and first_visible)
+        try:
+            error = await handler(page, selector, target, value, result, timeout, preflight)
+        except Exception as e:
+            error = str(e)
+        if error is None:
+            return ""
+        last_error = error
+    return last_error
 
 
 async def execute_step_async(page, step: Dict, dom: Dict) -> Dict:
@@ -18,8 +304,7 @@ async def execute_step_async(page, step: Dict, dom: Dict) -> Dict:
     Returns:
         Result dict with ok, message, time_ms
     """
-    import time
-    start = time.time()
+    start = time.perf_counter()
     
     action = step.get('action', '')
     target = step.get('target', '')
@@ -38,33 +323,52 @@ async def execute_step_async(page, step: Dict, dom: Dict) -> Dict:
             result['message'] = step.get('reason', 'Task complete')
             return result
         
+        page_handler = PAGE_ACTIONS.get(action)
+        if page_handler is not None:
+            await page_handler(page, target, value, result)
+            return result
+        
+        handler = ELEMENT_ACTIONS.get(action)
+        if handler is None:
+            result['message'] = f"Unknown action: {action}"
+            return result
+        
+        if action == 'type' and not value:
+            result['message'] = f"No value provided for typing into: {target}"
+            return result
+        
         # Find all potential candidates to retry
         candidates_to_try = []
         
         # 1. Try Find by Element ID (High Precision)
         element_id = step.get('element_id')
-        if element_id:
-            for node in dom.get('nodes', []):
-                if node.get('node_id') == element_id:
-                    # Add all candidates from this node
-                    node_candidates = node.get('candidates', [])
-                    if node_candidates:
-                        # Sort by score
-                        node_candidates.sort(key=lambda x: x.get('score', 0), reverse=True)
-                        for c in node_candidates:
-                            candidates_to_try.append(c.get('value'))
-                    
-                    # Add XPath as backup
-                    if node.get('xpath'):
-                        candidates_to_try.append(node.get('xpath'))
-                        
-                    if candidates_to_try:
-                        result['message'] += f" [Resolved ID: {element_id}]"
-                    break
+        node = _node_by_id(dom).get(element_id) if element_id else None
+        xpath_locator = None
+        if node is not None:
+            # Add all candidates from this node
+            node_candidates = node.get('candidates', [])
+            if node_candidates:
+                # Sort by score (in place, so later steps hit an already-sorted list)
+                node_candidates.sort(key=lambda x: x.get('score', 0), reverse=True)
+                for c in node_candidates:
+                    candidates_to_try.append(c.get('value'))
+            
+            # Add XPath as backup, as a locator with an explicit engine
+            if node.get('xpath'):
+                xpath_locator = page.locator(f"xpath={node['xpath']}").first
+                candidates_to_try.append(xpath_locator)
+                
+            if candidates_to_try:
+                result['message'] += f" [Resolved ID: {element_id}]"
         
         # 2. Add best fuzzy match selector if provided
         selector = step.get('selector')
-        if selector and selector not in candidates_to_try:
+        if selector and xpath_locator is not None and selector == node['xpath']:
+            # Same element as the XPath locator, which dict.fromkeys can't
+            # match against a string; promote the locator instead
+            candidates_to_try.remove(xpath_locator)
+            candidates_to_try.insert(0, xpath_locator)
+        elif selector and selector not in candidates_to_try:
             candidates_to_try.insert(0, selector)
             
         # 3. Fallback to fuzzy search if no ID matches or candidates found
@@ -73,165 +377,69 @@ async def execute_step_async(page, step: Dict, dom: Dict) -> Dict:
             if best_selector:
                 candidates_to_try.append(best_selector)
             
-            # 4. Try one more time with a more aggressive search
-            if not candidates_to_try:
-                target_lower = target.lower()
-                for node in dom.get('nodes', []):
-                    node_text = (node.get('text') or '').lower()
-                    node_aria = (node.get('aria_label') or '').lower()
-                    node_id = node.get('node_id', '')
-                    
-                    if (target_lower in node_text or 
-                        target_lower in node_aria or 
-                        (node_id and node_id in target_lower) or
-                        any(word in node_text for word in target_lower.split() if len(word) > 2)):
-                        
-                        node_candidates = node.get('candidates', [])
-                        if node_candidates:
-                            candidates_to_try.append(node_candidates[0].get('value'))
-                            break
-                        elif node.get('xpath'):
-                            candidates_to_try.append(node.get('xpath'))
-                            break
+            # 4. Let Playwright's selector engine search the live page
+            if not candidates_to_try and target:
+                locator = _text_locator(page, target)
+                if await locator.count() > 0:
+                    candidates_to_try.append(locator.first)
 
         if not candidates_to_try:
             result['message'] = f"Could not find selector for: {target} (ID: {element_id})"
             return result
             
-        # Deduplicate while preserving order
-        candidates_to_try = list(dict.fromkeys(candidates_to_try))
-        # Limit to top 3 candidates to avoid taking too long
-        candidates_to_try = candidates_to_try[:3] 
+        if len(candidates_to_try) > 1:
+            # Deduplicate while preserving order, limited to the top 3
+            # candidates to avoid taking too long
+            candidates_to_try = list(dict.fromkeys(candidates_to_try))[:3]
         
-        # Attempt execution with retries
-        success = False
-        last_error = ""
+        # Probe all candidates at once and try the best visible one first
+        action_timeout = ACTION_TIMEOUT_MS
+        first_visible = False
+        if len(candidates_to_try) > 1:
+            best = await _first_visible(page, candidates_to_try)
+            if best is None:
+                action_timeout = SHORT_ACTION_TIMEOUT_MS
+            else:
+                first_visible = True
+                if best:
+                    candidates_to_try.insert(0, candidates_to_try.pop(best))
         
-        for idx, selector in enumerate(candidates_to_try):
-            try:
-                if action == 'click':
-                    try:
-                        # Try standard click first
-                        await page.click(selector, timeout=2000)
-                        result['ok'] = True
-                        result['message'] = f"Clicked: {target}"
-                        success = True
-                        break
-                    except Exception as e:
-                        # Fallback to JS click immediately for this selector
-                        try:
-                            await page.evaluate(f'''(sel) => {{
-                                const el = document.querySelector(sel) || 
-                                           document.evaluate(sel, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-                                if (el) {{
-                                    el.click();
-                                    return true;
-                                }}
-                                return false;
-                            }}''', selector)
-                            result['ok'] = True
-                            result['message'] = f"Clicked (JS): {target}"
-                            success = True
-                            break
-                        except Exception as e2:
-                            last_error = f"Click failed with {selector}: {str(e2)}"
-                            # Continue to next candidate
-                
-                elif action == 'type':
-                    if not value:
-                        result['message'] = f"No value provided for typing into: {target}"
-                        return result
-                    
-                    try:
-                        # Try efficient fill first
-                        await page.fill(selector, value, timeout=2000)
-                        result['ok'] = True
-                        result['message'] = f"Typed '{value}' into: {target}"
-                        success = True
-                        
-                        # Auto-press Enter for search fields
-                        if 'search' in target.lower() or 'query' in target.lower():
-                            try:
-                                await page.keyboard.press('Enter')
-                                result['message'] += " + Pressed Enter"
-                            except:
-                                pass
-                        break
-                    except Exception as e:
-                        # Fallback to JS type
-                         # Properly escape the value for JavaScript
-                        escaped = value.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n').replace('\r', '\\r')
-                        
-                        js_code = f'''([sel, val]) => {{
-                            let el = null;
-                            // Try CSS selector first
-                            if (!sel.startsWith('/')) {{
-                                el = document.querySelector(sel);
-                            }}
-                            // Try XPath
-                            if (!el && sel.startsWith('/')) {{
-                                el = document.evaluate(sel, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-                            }}
-                            if (el) {{
-                                el.focus();
-                                el.value = '';
-                                el.value = val;
-                                el.dispatchEvent(new Event('input', {{ bubbles: true, cancelable: true }}));
-                                el.dispatchEvent(new Event('change', {{ bubbles: true, cancelable: true }}));
-                                return true;
-                            }}
-                            return false;
-                        }}'''
-                        
-                        if await page.evaluate(js_code, [selector, value]):
-                            result['ok'] = True
-                            result['message'] = f"Typed (JS) '{value}' into: {target}"
-                            success = True
-                            break
-                        else:
-                            last_error = f"JS Type failed with {selector}"
-    
-                elif action == 'scroll':
-                    direction = value.lower() if value else 'down'
-                    amount = 500 if direction == 'down' else -500
-                    await page.evaluate(f"window.scrollBy(0, {amount})")
-                    result['ok'] = True
-                    result['message'] = f"Scrolled {direction}"
-                    success = True
-                    break
-                    
-                elif action == 'navigate':
-                    await page.goto(target, timeout=15000)
-                    result['ok'] = True
-                    result['message'] = f"Navigated to: {target}"
-                    success = True
-                    break
-                    
-                elif action == 'wait':
-                    await asyncio.sleep(1)
-                    result['ok'] = True
-                    result['message'] = "Waited 1 second"
-                    success = True
-                    break
-                
-                else:
-                     result['message'] = f"Unknown action: {action}"
-                     break
-                    
-            except Exception as e:
-                last_error = str(e)
-                continue
-                
-        if not success and not result['ok']:
+        # Attempt execution with retries
+        last_error = await _attempt_with_candidates(
+            handler, page, candidates_to_try, target, value, result, action_timeout,
+            first_visible
+        )
+        if not result['ok']:
             result['message'] = f"Failed to execute action after trying {len(candidates_to_try)} selectors. Last error: {last_error}"
     
     except Exception as e:
         result['message'] = f"Error: {str(e)}"
+    finally:
+        result['time_ms'] = int((time.perf_counter() - start) * 1000)
     
-    result['time_ms'] = int((time.time() - start) * 1000)
     return result
 
 
+# Upper bound of selector.score_dom_candidate
+MAX_CANDIDATE_SCORE = 1.0
+
+# (score_dom_candidate, match_node_to_target), False if unavailable, None until first use
+_SCORE_FNS = None
+
+
+def _score_fns():
+    """Import the scoring functions from selector.py on first use only."""
+    global _SCORE_FNS
+    if _SCORE_FNS is None:
+        # Imported lazily: selector.py pulls in Levenshtein
+        try:
+            from src.selector.selector import score_dom_candidate, match_node_to_target
+            _SCORE_FNS = (score_dom_candidate, match_node_to_target)
+        except ImportError:
+            _SCORE_FNS = False
+    return _SCORE_FNS
+
+
 def find_best_selector(target: str, dom: Dict) -> Optional[str]:
     """
     Find the best CSS/XPath selector for a semantic target description.
@@ -239,19 +447,27 @@ def find_best_selector(target: str, dom: Dict) -> Optional[str]:
     """
     if not target:
         return None
-        
-    # Import scoring logic locally to avoid circular imports during module load
-    try:
-        from src.selector.selector import score_dom_candidate, match_node_to_target
-    except ImportError:
+    
+    # The same target is often resolved twice per step (app, then executor)
+    cache = _index_dom(dom).selectors
+    if target not in cache:
+        cache[target] = _score_best_selector(target, dom)
+    return cache[target]
+
+
+def _score_best_selector(target: str, dom: Dict) -> Optional[str]:
+    """Score every matching candidate in the snapshot and return the best value."""
+    score_fns = _score_fns()
+    if not score_fns:
         # Fallback if imports fail (e.g. strict environment)
         return _find_best_selector_fallback(target, dom)
+    score_dom_candidate, match_node_to_target = score_fns
     
-    nodes = dom.get('nodes', [])
-    matched_candidates = []
+    best_value = None
+    best_score = -1.0
     
     # Find nodes that match the target description
-    for node in nodes:
+    for node in dom.get('nodes', []):
         if not match_node_to_target(node, target):
             continue
         
@@ -270,52 +486,63 @@ def find_best_selector(target: str, dom: Dict) -> Optional[str]:
         for candidate in candidates:
             # Calculate score using the robust function
             score = score_dom_candidate(candidate, node, target, match_count=1)
-            
-            matched_candidates.append({
-                "node_id": node.get('node_id'),
-                "type": candidate.get('type', 'css'),
-                "value": candidate.get('value'),
-                "score": score
-            })
-    
-    # Sort by score descending
-    matched_candidates.sort(key=lambda x: x['score'], reverse=True)
+            # Strict '>' keeps the first of equal scores, as the old stable sort did
+            if score > best_score:
+                best_score = score
+                best_value = candidate.get('value')
+        
+        # Scores are capped at 1.0, so nothing later can beat this one
+        if best_score >= MAX_CANDIDATE_SCORE:
+            break
     
-    if matched_candidates:
-        best = matched_candidates[0]
-        # Only return if score is reasonable
-        if best['score'] > 0.3:
-            return best['value']
+    # Only return if score is reasonable
+    if best_score > 0.3:
+        return best_value
             
     return None
 
 
+def select_by_text(target: str, dom: Dict) -> Optional[str]:
+    """
+    Loose text/aria match used when scoring finds no selector.
+    
+    Returns the first matching node's top candidate, or its XPath.
+    """
+    target_lower = _tok(target)[0]
+    index = _index_dom(dom)
+    for node, node_text, node_aria in zip(index.nodes, index.texts, index.arias):
+        if not (target_lower in node_text or node_text in target_lower
+                or target_lower in node_aria):
+            continue
+        candidates = node.get('candidates')
+        if candidates:
+            return candidates[0].get('value')
+        if node.get('xpath'):
+            return node['xpath']
+    return None
+
+
 def _find_best_selector_fallback(target: str, dom: Dict) -> Optional[str]:
     """Fallback implementation if imports fail."""
-    target_lower = target.lower()
-    target_words = set(target_lower.split())
+    target_lower, target_words = _tok(target)
     
     best_match = None
     best_score = 0
     
-    for node in dom.get('nodes', []):
+    index = _index_dom(dom)
+    for node, text, aria, name, node_words in zip(
+            index.nodes, index.texts, index.arias, index.names, index.words):
         score = 0
         
-        text = (node.get('text') or '').lower()
         if target_lower in text or text in target_lower:
             score += 0.5
         
-        aria = (node.get('aria_label') or '').lower()
         if target_lower in aria or aria in target_lower:
             score += 0.6
             
-        attrs = node.get('attributes', {})
-        name = (attrs.get('name') or '').lower()
         if target_lower in name:
             score += 0.5
             
-        node_text = f"{text} {aria} {name}".lower()
-        node_words = set(node_text.split())
         if target_words:
             overlap = len(target_words & node_words)
             score += 0.3 * (overlap / len(target_words))
@@ -2,16 +2,86 @@
 Executor for running automation steps with Playwright.
 Includes validation, fallbacks, and screenshot capture.
 """
-import json
-import sys
 import os
 import argparse
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
+import orjson
 from playwright.sync_api import sync_playwright, Page, TimeoutError as PlaywrightTimeout
-import sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.selector_history import update_success
+
+from src.utils.js_helpers import JS_HELPERS
+from src.utils.selector_history import SelectorHistoryBatch, update_success
+
+
+# How long validators wait for an action's effect (navigation, new text)
+VALIDATE_TIMEOUT_MS = 2000
+# Lower bound of the 'wait' action, which otherwise ends when the network is idle
+WAIT_MIN_MS = 250
+
+
+def settle(page: Page, timeout_ms: int, state: str = "domcontentloaded"):
+    """
+    Wait until the current document reaches a load state, or give up after timeout_ms.
+    
+    Returns immediately when the state already holds, unlike a fixed sleep.
+    A navigation that has not committed yet still counts as the old,
+    loaded document, so this does not wait for it; validators that
+    depend on one wait for their condition instead.
+    """
+    try:
+        page.wait_for_load_state(state, timeout=timeout_ms)
+    except PlaywrightTimeout:
+        pass
+
+
+def _check_value_equals(page: Page, validator: Dict) -> bool:
+    selector = validator.get('selector', 'input')
+    expected = validator.get('value', '')
+    try:
+        el = page.locator(selector).first
+        if not el.count():
+            return False
+        # Live value property, not the initial value attribute
+        return el.input_value(timeout=1000) == expected
+    except:
+        return False
+
+
+def _check_url_contains(page: Page, validator: Dict) -> bool:
+    expected = validator.get('value', '').lower()
+    if expected in page.url.lower():
+        return True
+    # The action may have started a navigation that has not committed yet
+    try:
+        page.wait_for_url(lambda url: expected in url.lower(),
+                          wait_until="commit", timeout=VALIDATE_TIMEOUT_MS)
+        return True
+    except PlaywrightTimeout:
+        return False
+
+
+def _check_text_contains(page: Page, validator: Dict) -> bool:
+    expected = validator.get('text_contains', '')
+    if not expected:
+        return True
+    # Case-insensitive substring search runs in the page, so the
+    # document is never serialized over to Python. Waits, since the text
+    # may only appear once a request the action started has finished.
+    try:
+        page.get_by_text(expected).first.wait_for(state="attached", timeout=VALIDATE_TIMEOUT_MS)
+        return True
+    except PlaywrightTimeout:
+        return False
+
+
+VALIDATORS = {
+    # Just check that page is responsive
+    'presence': lambda page, validator: True,
+    'value_equals': _check_value_equals,
+    'url_contains': _check_url_contains,
+    'text_contains': _check_text_contains,
+}
 
 
 def validate_step(page: Page, validator: Dict) -> bool:
@@ -24,62 +94,47 @@ def validate_step(page: Page, validator: Dict) -> bool:
     - url_contains: URL contains substring
     - text_contains: Page contains text
     """
-    val_type = validator.get('type')
+    handler = VALIDATORS.get(validator.get('type'))
+    if handler is None:
+        # Unknown validator type, assume pass
+        return True
     
     try:
-        if val_type == 'presence':
-            # Just check that page is responsive
-            return True
-        
-        elif val_type == 'value_equals':
-            selector = validator.get('selector', 'input')
-            expected = validator.get('value', '')
-            try:
-                el = page.query_selector(selector)
-                if el:
-                    actual = el.get_attribute('value') or ''
-                    return actual == expected
-            except:
-                return False
-        
-        elif val_type == 'url_contains':
-            expected = validator.get('value', '')
-            return expected.lower() in page.url.lower()
-        
-        elif val_type == 'text_contains':
-            expected = validator.get('text_contains', '')
-            content = page.content()
-            return expected.lower() in content.lower()
-        
-        else:
-            # Unknown validator type, assume pass
-            return True
-    
+        return handler(page, validator)
     except Exception as e:
         print(f"  Validation error: {e}")
         return False
 
 
+def _locator(page: Page, selector: str, selector_type: str = "css"):
+    return page.locator(selector if selector_type == "css" else f"xpath={selector}")
+
+
+def ensure_helpers(page: Page):
+    """Install JS_HELPERS on a page once; later documents get them via init script."""
+    if getattr(page, '_ig_helpers_installed', False):
+        return
+    page.add_init_script(JS_HELPERS)
+    page.evaluate(JS_HELPERS)
+    page._ig_helpers_installed = True
+
+
 def try_click(page: Page, selector: str, selector_type: str = "css", timeout_ms: int = 1500) -> bool:
     """
     Try to click an element with fallback to JavaScript click.
     """
+    locator = _locator(page, selector, selector_type).first
     try:
         # Try normal Playwright click
-        if selector_type == "css":
-            page.click(selector, timeout=timeout_ms)
-        else:  # xpath
-            page.click(f"xpath={selector}", timeout=timeout_ms)
+        locator.click(timeout=timeout_ms)
         return True
     except Exception as e:
         print(f"    Normal click failed: {e}, trying JS click...")
         try:
-            # Fallback: JavaScript click
-            if selector_type == "css":
-                page.evaluate(f"document.querySelector('{selector}').click()")
-            else:
-                page.evaluate(f"document.evaluate('{selector}', document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue.click()")
-            time.sleep(0.3)  # Small wait for JS click to take effect
+            # Fallback: JavaScript click on the same locator
+            locator.evaluate("el => el.click()", timeout=timeout_ms)
+            # Let a document the click already navigated to finish loading
+            settle(page, 500)
             return True
         except Exception as e2:
             print(f"    JS click also failed: {e2}")
@@ -90,39 +145,56 @@ def try_type(page: Page, selector: str, value: str, selector_type: str = "css",
     """
     Try to type into an element with fallback to JavaScript value setter.
     """
+    locator = _locator(page, selector, selector_type).first
     try:
         # Try normal Playwright type
-        if selector_type == "css":
-            page.fill(selector, value, timeout=timeout_ms)
-        else:  # xpath
-            page.fill(f"xpath={selector}", value, timeout=timeout_ms)
+        locator.fill(value, timeout=timeout_ms)
         return True
     except Exception as e:
         print(f"    Normal type failed: {e}, trying JS value setter...")
         try:
-            # Fallback: JavaScript value setter
-            escaped_value = value.replace("'", "\\'")
-            if selector_type == "css":
-                page.evaluate(f"""
-                    const el = document.querySelector('{selector}');
-                    el.value = '{escaped_value}';
-                    el.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                    el.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                """)
-            else:
-                page.evaluate(f"""
-                    const el = document.evaluate('{selector}', document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-                    el.value = '{escaped_value}';
-                    el.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                    el.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                """)
-            time.sleep(0.3)
+            # Fallback: the page-side value setter, called on the same locator
+            ensure_helpers(page)
+            locator.evaluate("(el, v) => window.__ig_fill_el(el, v)", value, timeout=timeout_ms)
+            # Let a document the input events already navigated to finish loading
+            settle(page, 500)
             return True
         except Exception as e2:
             print(f"    JS value setter also failed: {e2}")
             return False
 
 
+def order_candidates(page: Page, candidates: List[Dict], timeout_ms: int, short_timeout_ms: int = 250) -> List[tuple]:
+    """
+    Probe all candidates with a single wait and order them for attempts.
+    
+    The candidates are OR-ed into one locator, so the whole set waits at most
+    timeout_ms instead of each one burning its own timeout in turn. Visible
+    candidates come first with the full action timeout; the rest follow with
+    a short one so they fail fast into the JS fallback.
+    
+    Returns:
+        List of (candidate, timeout_ms) in attempt order
+    """
+    if len(candidates) < 2:
+        return [(c, timeout_ms) for c in candidates]
+    try:
+        locators = [_locator(page, c.get('value'), c.get('type', 'css')) for c in candidates]
+        combined = locators[0]
+        for loc in locators[1:]:
+            combined = combined.or_(loc)
+        combined.first.wait_for(state="visible", timeout=timeout_ms)
+        visible = [loc.first.is_visible() for loc in locators]
+    except PlaywrightTimeout:
+        visible = [False] * len(candidates)
+    except Exception:
+        # e.g. a malformed selector: keep the plain serial order
+        return [(c, timeout_ms) for c in candidates]
+    live = [(c, timeout_ms) for c, v in zip(candidates, visible) if v]
+    rest = [(c, short_timeout_ms) for c, v in zip(candidates, visible) if not v]
+    return live + rest
+
+
 def execute_step(page: Page, step: Dict, candidates: List[Dict], step_timeout_sec: int = 5, action_timeout_ms: int = 3000) -> Dict:
     """
     Execute a single step with candidate fallback.
@@ -156,7 +228,10 @@ def execute_step(page: Page, step: Dict, candidates: List[Dict], step_timeout_se
         # Handle wait action
         if action == 'wait':
             print(f"  Waiting...")
-            time.sleep(1)
+            # Up to the old fixed 1s, but done once the network is quiet;
+            # always at least WAIT_MIN_MS so the wait is never a no-op
+            page.wait_for_timeout(WAIT_MIN_MS)
+            settle(page, 1000 - WAIT_MIN_MS, "networkidle")
             validator = step.get('expect')
             if validator:
                 result['ok'] = validate_step(page, validator)
@@ -166,22 +241,28 @@ def execute_step(page: Page, step: Dict, candidates: List[Dict], step_timeout_se
             result['time_ms'] = (time.time() - start_time) * 1000
             return result
         
+        tried = candidates[:3]  # Max 3 attempts
+        if action in ('click', 'type'):
+            attempts = order_candidates(page, tried, action_timeout_ms)
+        else:
+            attempts = [(c, action_timeout_ms) for c in tried]
+        
         # Try each candidate in order
-        for idx, candidate in enumerate(candidates[:3]):  # Max 3 attempts
+        for idx, (candidate, timeout_ms) in enumerate(attempts):
             selector = candidate.get('value')
             selector_type = candidate.get('type', 'css')
             node_id = candidate.get('node_id')
             
-            print(f"  Trying candidate {idx+1}/{min(len(candidates), 3)}: {selector}")
+            print(f"  Trying candidate {idx+1}/{len(attempts)}: {selector}")
             
             try:
                 # Execute action based on type
                 if action == 'click':
-                    success = try_click(page, selector, selector_type, action_timeout_ms)
+                    success = try_click(page, selector, selector_type, timeout_ms)
                 
                 elif action == 'type':
                     value = step.get('value', '')
-                    success = try_type(page, selector, value, selector_type, action_timeout_ms)
+                    success = try_type(page, selector, value, selector_type, timeout_ms)
                 
                 elif action == 'scroll':
                     # Simple scroll implementation
@@ -211,8 +292,9 @@ def execute_step(page: Page, step: Dict, candidates: List[Dict], step_timeout_se
                 
                 # Check if action succeeded
                 if success:
-                    # Wait a bit for page to update
-                    time.sleep(0.5)
+                    # Let a document the action already navigated to load;
+                    # validators below wait for changes still in flight
+                    settle(page, action_timeout_ms)
                     
                     # Validate if validator specified
                     validator = step.get('expect')
@@ -249,9 +331,10 @@ def execute_step(page: Page, step: Dict, candidates: List[Dict], step_timeout_se
         result['time_ms'] = (time.time() - start_time) * 1000
         
         # Capture screenshot on failure
-        screenshot_path = f"fail_{step_id}.png"
+        # Viewport-only JPEG: far cheaper to encode and transfer than PNG
+        screenshot_path = f"fail_{step_id}.jpg"
         try:
-            page.screenshot(path=screenshot_path)
+            page.screenshot(path=screenshot_path, type="jpeg", quality=60, full_page=False)
             result['screenshot_path'] = screenshot_path
             print(f"  Captured failure screenshot: {screenshot_path}")
         except:
@@ -265,26 +348,42 @@ def execute_step(page: Page, step: Dict, candidates: List[Dict], step_timeout_se
         return result
 
 
-def execute_all(snapshot_path: str, steps_path: str, candidates_path: str, output_path: str = "results.json"):
+def _load_json(path: str):
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+def execute_all(snapshot_path: Optional[str] = None, steps_path: Optional[str] = None,
+                candidates_path: Optional[str] = None, output_path: str = "results.json",
+                *, snapshot: Optional[Dict] = None, steps: Optional[List[Dict]] = None,
+                candidates: Optional[Dict] = None):
     """
     Execute all steps with their candidates.
-    """
-    # Load data
-    with open(snapshot_path, 'r', encoding='utf-8') as f:
-        snapshot = json.load(f)
     
-    with open(steps_path, 'r', encoding='utf-8') as f:
-        steps = json.load(f)
+    Each input can be given as a path or, for in-process callers, as the
+    already loaded object (snapshot=, steps=, candidates=).
+    """
+    inputs = [snapshot, steps, candidates]
+    paths = [snapshot_path, steps_path, candidates_path]
+    missing = [i for i, obj in enumerate(inputs) if obj is None]
+    for i in missing:
+        if paths[i] is None:
+            raise ValueError("execute_all needs a path or an object for each input")
     
-    with open(candidates_path, 'r', encoding='utf-8') as f:
-        all_candidates = json.load(f)
+    # Load data; the files are independent, so read them concurrently
+    if missing:
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            for i, obj in zip(missing, pool.map(_load_json, [paths[i] for i in missing])):
+                inputs[i] = obj
+    snapshot, steps, all_candidates = inputs
     
     print(f"Executing {len(steps)} steps...")
     
     # Start browser
     with sync_playwright() as p:
-        # Launch visible browser for CLI mode
-        browser = p.chromium.launch(headless=False, slow_mo=500)
+        # Visible by default for CLI mode; no slow_mo, waits are event-driven
+        headless = os.getenv("INTERACTGEN_HEADLESS", "0") != "0"
+        browser = p.chromium.launch(headless=headless)
         page = browser.new_page()
         
         # Navigate to initial URL
@@ -295,24 +394,26 @@ def execute_all(snapshot_path: str, steps_path: str, candidates_path: str, outpu
         
         results = []
         
-        # Execute each step
-        for step in steps:
-            step_id = step.get('step_id')
-            print(f"\n[{step_id}] {step.get('action')} - {step.get('target', 'N/A')}")
+        # Selector history is written once for the whole run
+        with SelectorHistoryBatch():
+            # Execute each step
+            for step in steps:
+                step_id = step.get('step_id')
+                print(f"\n[{step_id}] {step.get('action')} - {step.get('target', 'N/A')}")
             
-            # Get candidates for this step
-            step_candidates_data = all_candidates.get(step_id, {})
-            candidates = step_candidates_data.get('candidates', [])
+                # Get candidates for this step
+                step_candidates_data = all_candidates.get(step_id, {})
+                candidates = step_candidates_data.get('candidates', [])
             
-            # Execute step
-            result = execute_step(page, step, candidates)
-            results.append(result)
+                # Execute step
+                result = execute_step(page, step, candidates)
+                results.append(result)
             
-            # Stop on first failure (optional - could continue)
-            if not result['ok']:
-                print(f"  Step failed: {result.get('reason')}")
-                # Uncomment to stop on failure:
-                # break
+                # Stop on first failure (optional - could continue)
+                if not result['ok']:
+                    print(f"  Step failed: {result.get('reason')}")
+                    # Uncomment to stop on failure:
+                    # break
         
         browser.close()
     
@@ -327,8 +428,8 @@ def execute_all(snapshot_path: str, steps_path: str, candidates_path: str, outpu
         }
     }
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2)
+    with open(output_path, 'wb') as f:
+        f.write(orjson.dumps(output_data, option=orjson.OPT_INDENT_2))
     
     print(f"\n{'='*60}")
     print(f"Results saved to {output_path}")
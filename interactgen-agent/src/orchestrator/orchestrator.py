@@ -2,15 +2,51 @@
 Main orchestrator for coordinating all components.
 Provides both sync (CLI) and async (chatbot) execution modes.
 """
-import json
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 from dotenv import load_dotenv
+import orjson
+
+from src.scraper.fast_snapshot import dom_fingerprint, snapshot_page
+from src.planner.planner_agent import interactive_index, plan_with_groq
+from src.selector.selector import select_candidates_hybrid
+from src.executor.executor import SelectorHistoryBatch, execute_step
+from src.utils.selector_history import run_with_success_counts, success_counts
+from src.utils.snapshot_cache import SnapshotCache
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Snapshots are stored once, under their DOM fingerprint key. Queries for
+# the same URL within a TTL bucket reuse the latest one without loading
+# the page, through a small map of bucket key -> fingerprint key.
+SNAPSHOT_TTL_SEC = 300
+_SNAPSHOT_CACHE = SnapshotCache(max_bytes=256 * 1024 * 1024)
+_RECENT_DOM_KEYS: "OrderedDict[str, str]" = OrderedDict()
+_RECENT_DOM_KEYS_SIZE = 1024
+_recent_lock = threading.Lock()
+
+
+def _recent_snapshot(cache_key: str) -> Optional[Dict]:
+    """Return the snapshot last taken for a URL's TTL bucket, if still cached."""
+    with _recent_lock:
+        dom_key = _RECENT_DOM_KEYS.get(cache_key)
+    return _SNAPSHOT_CACHE.get(dom_key) if dom_key is not None else None
+
+
+def _remember_snapshot(cache_key: str, dom_key: str):
+    """Point a URL's TTL bucket at a fingerprint key in _SNAPSHOT_CACHE."""
+    with _recent_lock:
+        _RECENT_DOM_KEYS[cache_key] = dom_key
+        _RECENT_DOM_KEYS.move_to_end(cache_key)
+        while len(_RECENT_DOM_KEYS) > _RECENT_DOM_KEYS_SIZE:
+            _RECENT_DOM_KEYS.popitem(last=False)
+
 
 class Orchestrator:
     """Coordinates scraper, planner, selector, and executor components."""
@@ -19,8 +55,56 @@ class Orchestrator:
         self.groq_api_key = groq_api_key or os.getenv("GROQ_API_KEY")
         if not self.groq_api_key:
             raise ValueError("GROQ_API_KEY required")
+        # Playwright driver and browser are started on first use and kept
+        # across queries; each query gets its own context
+        self._pw = None
+        self._browser = None
     
-    def execute_query_sync(self, query: str, url: str, output_dir: str = "logs") -> Dict[str, Any]:
+    def _get_browser(self):
+        """Return the shared headless browser, launching it on first use."""
+        if self._browser is None:
+            from playwright.sync_api import sync_playwright
+            self._pw = sync_playwright().start()
+            self._browser = self._pw.chromium.launch(headless=True)
+        return self._browser
+    
+    def close(self):
+        """Shut down the shared browser and Playwright driver."""
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._pw is not None:
+            self._pw.stop()
+            self._pw = None
+    
+    def _snapshot(self, url: str) -> tuple:
+        """
+        Load the page and snapshot it, unless its DOM fingerprint matches a
+        snapshot already taken for this URL.
+        
+        Returns:
+            (fingerprint cache key, snapshot dict)
+        """
+        context = self._get_browser().new_context()
+        try:
+            page = context.new_page()
+            page.goto(url, wait_until='networkidle', timeout=30000)
+            dom_key = f"{url}|dom:{dom_fingerprint(page)}"
+            snapshot_data = _SNAPSHOT_CACHE.get(dom_key)
+            if snapshot_data is not None:
+                print("  DOM unchanged, reusing snapshot")
+                return dom_key, snapshot_data
+            snapshot_data = snapshot_page(page, url, None, navigate=False)
+            # Build the planner's index before caching, so the cached size
+            # accounts for it and nothing mutates the snapshot afterwards
+            interactive_index(snapshot_data)
+            _SNAPSHOT_CACHE.put(dom_key, snapshot_data)
+            return dom_key, snapshot_data
+        finally:
+            context.close()
+    
+    def execute_query_sync(self, query: str, url: str, output_dir: str = "logs",
+                           dump_intermediate: bool = False) -> Dict[str, Any]:
         """
         Execute a query synchronously (for CLI use).
         
@@ -28,77 +112,115 @@ class Orchestrator:
             query: Natural language query
             url: Target website URL
             output_dir: Directory for output files
+            dump_intermediate: Also write snapshot.json, steps.json and
+                candidates.json; results.json already holds steps and
+                candidates, and everything is passed in memory
         
         Returns:
             Results dictionary with steps, candidates, and execution results
         """
-        from src.scraper.fast_snapshot import snapshot
-        from src.planner.planner_agent import plan_with_groq
-        from src.selector.selector import select_candidates_hybrid
-        from src.executor.executor import execute_step
-        from playwright.sync_api import sync_playwright
-        
         # Create output directory
         Path(output_dir).mkdir(parents=True, exist_ok=True)
         
         # Step 1: Scrape
         print(f"[1/4] Scraping {url}...")
-        snapshot_path = f"{output_dir}/snapshot.json"
-        snapshot(url, snapshot_path)
+        cache_key = f"{url}|{int(time.time() // SNAPSHOT_TTL_SEC)}"
+        snapshot_data = _recent_snapshot(cache_key)
+        if snapshot_data is None:
+            dom_key, snapshot_data = self._snapshot(url)
+            _remember_snapshot(cache_key, dom_key)
+        else:
+            print("  Reusing cached snapshot")
         
-        with open(snapshot_path, 'r') as f:
-            snapshot_data = json.load(f)
+        if dump_intermediate:
+            # Written on cache hits too, not only when the page was scraped
+            with open(f"{output_dir}/snapshot.json", 'wb') as f:
+                f.write(orjson.dumps(snapshot_data, option=orjson.OPT_INDENT_2))
         
         # Step 2: Plan
         print(f"[2/4] Planning steps for: {query}")
         steps = plan_with_groq(query, url, snapshot_data, self.groq_api_key)
         
-        steps_path = f"{output_dir}/steps.json"
-        with open(steps_path, 'w') as f:
-            json.dump(steps, f, indent=2)
+        if dump_intermediate:
+            steps_path = f"{output_dir}/steps.json"
+            with open(steps_path, 'wb') as f:
+                f.write(orjson.dumps(steps, option=orjson.OPT_INDENT_2))
         
         # Step 3: Select candidates
+        # Selection is pure Python, so extra threads would only contend for
+        # the GIL. A single worker instead runs it in the background while
+        # the main thread waits on the browser, and each step only blocks
+        # on its own candidates.
+        # Every step is scored against the selector history as it stood
+        # before execution (as when selection ran up front), not the live
+        # one: otherwise whether step N's outcome boosts step N+1 would
+        # depend on thread timing.
         print(f"[3/4] Selecting element candidates...")
-        all_candidates = {}
+        history_counts = success_counts()
+        selector_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="selector")
+        # Plans often repeat targets; each selection walks every snapshot node
+        sel_cache: Dict[tuple, Future] = {}
+        pending: Dict[str, tuple] = {}
         
         for step in steps:
             if step.get('action') in ['click', 'type', 'extract']:
                 target = step.get('target', '')
                 visual_hint = step.get('visual_hint')
-                candidates = select_candidates_hybrid(snapshot_data, target, visual_hint, 3)
-                all_candidates[step['step_id']] = {
+                key = (target, visual_hint)
+                if key not in sel_cache:
+                    sel_cache[key] = selector_pool.submit(
+                        run_with_success_counts, history_counts,
+                        select_candidates_hybrid, snapshot_data, target, visual_hint, 3
+                    )
+                pending[step['step_id']] = (target, sel_cache[key])
+        selector_pool.shutdown(wait=False)
+        
+        all_candidates = {}
+        
+        def candidates_for(step_id: str) -> List[Dict]:
+            if step_id not in pending:
+                return []
+            if step_id not in all_candidates:
+                target, fut = pending[step_id]
+                all_candidates[step_id] = {
                     "target": target,
-                    "candidates": candidates
+                    "candidates": fut.result()
                 }
-        
-        candidates_path = f"{output_dir}/candidates.json"
-        with open(candidates_path, 'w') as f:
-            json.dump(all_candidates, f, indent=2)
+            return all_candidates[step_id]['candidates']
         
         # Step 4: Execute
         print(f"[4/4] Executing {len(steps)} steps...")
         
         results = []
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
+        context = self._get_browser().new_context()
+        try:
+            page = context.new_page()
             
-            for step in steps:
-                step_id = step['step_id']
-                print(f"  [{step_id}] {step.get('action')} - {step.get('target', 'N/A')}")
+            # Selector history is written once per query, not per attempt
+            with SelectorHistoryBatch():
+                for step in steps:
+                    step_id = step['step_id']
+                    print(f"  [{step_id}] {step.get('action')} - {step.get('target', 'N/A')}")
                 
-                candidates = all_candidates.get(step_id, {}).get('candidates', [])
+                    candidates = candidates_for(step_id)
                 
-                # Import executor function
-                from src.executor.executor import execute_step
-                result = execute_step(page, step, candidates)
-                results.append(result)
+                    result = execute_step(page, step, candidates)
+                    results.append(result)
                 
-                if not result['ok']:
-                    print(f"    ✗ Failed: {result.get('reason')}")
-                    # Could break here or continue
-            
-            browser.close()
+                    if not result['ok']:
+                        print(f"    ✗ Failed: {result.get('reason')}")
+                        # Could break here or continue
+        finally:
+            context.close()
+        
+        # Steps skipped by an error are still selected; keep plan order
+        for step_id in pending:
+            candidates_for(step_id)
+        all_candidates = {step_id: all_candidates[step_id] for step_id in pending}
+        if dump_intermediate:
+            candidates_path = f"{output_dir}/candidates.json"
+            with open(candidates_path, 'wb') as f:
+                f.write(orjson.dumps(all_candidates, option=orjson.OPT_INDENT_2))
         
         # Summary
         passed = sum(1 for r in results if r['ok'])
@@ -121,8 +243,8 @@ class Orchestrator:
         
         # Save results
         results_path = f"{output_dir}/results.json"
-        with open(results_path, 'w') as f:
-            json.dump(summary, f, indent=2)
+        with open(results_path, 'wb') as f:
+            f.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
         
         print(f"\n{'='*60}")
         print(f"Results: {passed}/{total} steps passed")
@@ -140,11 +262,16 @@ def main():
     parser.add_argument("--query", required=True, help="Natural language query")
     parser.add_argument("--url", required=True, help="Target website URL")
     parser.add_argument("--output", "-o", default="logs", help="Output directory")
+    parser.add_argument("--dump-intermediate", action="store_true",
+                        help="Also write snapshot.json, steps.json and candidates.json")
     
     args = parser.parse_args()
     
     orchestrator = Orchestrator()
-    orchestrator.execute_query_sync(args.query, args.url, args.output)
+    try:
+        orchestrator.execute_query_sync(args.query, args.url, args.output, args.dump_intermediate)
+    finally:
+        orchestrator.close()
 
 
 if __name__ == "__main__":
@@ -2,17 +2,55 @@
 LLM-powered planner using Groq API (gpt-oss-120B).
 Converts natural language queries to semantic automation steps.
 """
+import copy
+import hashlib
 import json
-import sys
 import os
 import argparse
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
 from groq import Groq
 from dotenv import load_dotenv
 
+from src.utils.plan_cache import PlanCache, plan_cache_key
+
 # Load environment variables from .env file
 load_dotenv()
 
+PLAN_MODEL = "llama-3.3-70b-versatile"
+# Bump when SYSTEM_PROMPT or the plan format changes to invalidate cached plans
+PROMPT_VERSION = 1
+# Opt-in: set INTERACTGEN_PLAN_CACHE to a directory (e.g. ~/.interactgen/plan_cache)
+# to reuse plans across runs. The key only sees the first few interactive
+# elements, so plans also expire after INTERACTGEN_PLAN_CACHE_TTL seconds.
+PLAN_CACHE_DIR = os.getenv("INTERACTGEN_PLAN_CACHE", "")
+PLAN_CACHE_TTL_SEC = float(os.getenv("INTERACTGEN_PLAN_CACHE_TTL", "86400"))
+PLAN_CACHE_MAX_ENTRIES = 1000
+# PlanCache once opened, False once opening it failed, None until first use
+_plan_cache = None
+
+
+@lru_cache(maxsize=4)
+def _get_client(api_key: str) -> Groq:
+    """One client per key, so its HTTP connection pool stays warm across calls."""
+    return Groq(api_key=api_key)
+
+
+def _get_plan_cache():
+    """Open the on-disk plan cache on first use; None when disabled."""
+    global _plan_cache
+    if _plan_cache is None and PLAN_CACHE_DIR:
+        try:
+            _plan_cache = PlanCache(PLAN_CACHE_DIR, max_entries=PLAN_CACHE_MAX_ENTRIES,
+                                    max_age_sec=PLAN_CACHE_TTL_SEC)
+        except OSError as e:
+            # Don't retry the directory creation on every plan
+            print(f"Plan cache disabled: {e}")
+            _plan_cache = False
+    return _plan_cache or None
+
 
 # Few-shot examples for prompt
 FEW_SHOT_EXAMPLES = """
@@ -79,6 +117,89 @@ Now convert the user's query into steps following this exact format.
 """
 
 
+def strip_code_fence(content: str) -> str:
+    """
+    Return the body of the first ```json (or else first ```) block, or the
+    content unchanged when there is no fence, which is the usual case.
+    """
+    start = content.find("```")
+    if start < 0:
+        return content
+    tagged = content.find("```json", start)
+    body = content[tagged + 7:] if tagged >= 0 else content[start + 3:]
+    end = body.find("```")
+    return (body if end < 0 else body[:end]).strip()
+
+
+def read_first_json_object(stream) -> str:
+    """
+    Consume a streamed completion until its first top-level JSON object
+    closes, then close the stream and return that object's text.
+    
+    Braces inside string literals are ignored. If the stream ends before
+    an object completes, the whole (fence-stripped) content is returned
+    for the caller's JSON parser to judge.
+    """
+    content = ""
+    start = -1
+    depth = 0
+    in_string = escaped = False
+    try:
+        for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            pos = len(content)
+            content += chunk.choices[0].delta.content
+            for i in range(pos, len(content)):
+                ch = content[i]
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif ch == '\\':
+                        escaped = True
+                    elif ch == '"':
+                        in_string = False
+                elif ch == '"':
+                    in_string = start >= 0
+                elif ch == '{':
+                    if start < 0:
+                        start = i
+                    depth += 1
+                elif ch == '}' and start >= 0:
+                    depth -= 1
+                    if depth == 0:
+                        return content[start:i + 1]
+    finally:
+        stream.close()
+    return strip_code_fence(content.strip())
+
+
+PLAN_CONTEXT_TAGS = {'button', 'a', 'input', 'select', 'textarea'}
+
+
+def interactive_index(snapshot: Dict) -> List[Dict[str, str]]:
+    """
+    Return the planner's view of a snapshot: tag, text and aria label of the
+    interactive elements among its first 20 nodes, at most 10 of them.
+    
+    Built once per snapshot and stored on it under 'interactive_index', so
+    repeated plans against a cached snapshot skip the node scan.
+    """
+    index = snapshot.get('interactive_index')
+    if index is None:
+        index = [
+            {
+                "tag": node['tag'],
+                "text": (node.get('text') or '')[:50],
+                "aria": (node.get('aria_label') or '')[:30],
+            }
+            for node in snapshot.get('nodes', [])[:20]  # Limit to first 20 elements
+            if node.get('tag') in PLAN_CONTEXT_TAGS
+        ][:10]
+        snapshot['interactive_index'] = index
+    return index
+
+
 def plan_with_groq(query: str, url: str, snapshot_context: Dict = None, api_key: str = None) -> List[Dict[str, Any]]:
     """
     Use Groq to convert natural language query to semantic steps.
@@ -98,33 +219,39 @@ def plan_with_groq(query: str, url: str, snapshot_context: Dict = None, api_key:
     if not api_key:
         raise ValueError("GROQ_API_KEY not set. Get your free key at https://console.groq.com")
     
-    client = Groq(api_key=api_key)
+    index = interactive_index(snapshot_context) if snapshot_context and 'nodes' in snapshot_context else []
+    
+    # Identical inputs produce the same plan; skip the API round trip
+    cache = _get_plan_cache()
+    if cache is not None:
+        cache_key = plan_cache_key(query, url, PLAN_MODEL, PROMPT_VERSION, index)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    client = _get_client(api_key)
     
     # Build user message
     user_message = f"Query: {query}\nURL: {url}\n"
     
     # Add context from snapshot if available
-    if snapshot_context and 'nodes' in snapshot_context:
-        # Extract key information from snapshot
+    if index:
         interactive_elements = []
-        for node in snapshot_context['nodes'][:20]:  # Limit to first 20 elements
-            if node.get('tag') in ['button', 'a', 'input', 'select', 'textarea']:
-                elem_desc = f"{node.get('tag')}"
-                if node.get('text'):
-                    elem_desc += f": {node.get('text')[:50]}"
-                if node.get('aria_label'):
-                    elem_desc += f" (aria: {node.get('aria_label')[:30]})"
-                interactive_elements.append(elem_desc)
-        
-        if interactive_elements:
-            user_message += f"\nAvailable elements on page:\n" + "\n".join(interactive_elements[:10])
+        for entry in index:
+            elem_desc = entry['tag']
+            if entry['text']:
+                elem_desc += f": {entry['text']}"
+            if entry['aria']:
+                elem_desc += f" (aria: {entry['aria']})"
+            interactive_elements.append(elem_desc)
+        user_message += f"\nAvailable elements on page:\n" + "\n".join(interactive_elements)
     
     user_message += "\n\nGenerate steps:"
     
     # Call Groq API
     try:
         response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",  # Fast and capable model
+            model=PLAN_MODEL,  # Fast and capable model
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": user_message}
@@ -138,10 +265,7 @@ def plan_with_groq(query: str, url: str, snapshot_context: Dict = None, api_key:
         
         # Try to parse JSON from response
         # Sometimes LLMs wrap JSON in markdown code blocks
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
+        content = strip_code_fence(content)
         
         # Parse JSON
         steps = json.loads(content)
@@ -154,6 +278,8 @@ def plan_with_groq(query: str, url: str, snapshot_context: Dict = None, api_key:
             if 'step_id' not in step or 'action' not in step:
                 raise ValueError(f"Step missing required fields: {step}")
         
+        if cache is not None:
+            cache.put(cache_key, steps)
         return steps
     
     except json.JSONDecodeError as e:
@@ -179,6 +305,83 @@ Rules:
 - Return ONLY JSON, no text"""
 
 
+# Never described to the single-step planner
+_SKIP_TAGS = frozenset({'script', 'style', 'meta', 'link', 'noscript', 'img', 'svg', 'path'})
+# Always described, even without text/aria/role
+_INTERACTIVE_TAGS = frozenset({'button', 'a', 'input', 'select', 'textarea'})
+
+# Element priority for the single-step prompt; viewport, aria, text and
+# data-testid add bonuses on top
+_ROLE_WEIGHT = {
+    'button': 100, 'input': 95, 'textarea': 95, 'a': 80, 'select': 75,
+    'label': 40, 'form': 30,
+}
+_DEFAULT_ROLE_WEIGHT = 10
+# Character budget for the element list (~500 tokens)
+ELEMENT_CONTEXT_CHARS = 2000
+
+
+def _describe_node(node_id: str, tag: str, text: str, aria: str, attrs: Dict) -> str:
+    """One-line element description for the single-step planner."""
+    parts = [f"[ID:{node_id}]", tag]
+    
+    if aria:
+        parts.append(f"aria:{aria[:40]}")
+    elif text:
+        parts.append(f"'{text[:40]}'")
+        
+    # Add extra attributes for better identification if ID/Text is weak
+    if attrs.get('name'):
+        parts.append(f"name:{attrs['name'][:30]}")
+    if attrs.get('placeholder'):
+        parts.append(f"ph:{attrs['placeholder'][:30]}")
+    if attrs.get('type'):
+        parts.append(f"type:{attrs['type']}")
+    if attrs.get('role'):
+        parts.append(f"role:{attrs['role']}")
+    if attrs.get('href') and tag == 'a':
+        parts.append(f"href:{attrs['href'][:40]}")
+    
+    return " ".join(parts)
+
+
+def _history_line(entry: Dict) -> str:
+    """One-line summary of an executed step for the single-step planner."""
+    step = entry.get('step', {})
+    result = entry.get('result', {})
+    ok = result.get('ok')
+    reason = result.get('message', '')
+    # Show more context, especially for warnings
+    limit = 100 if not ok or "WARNING" in reason else 60
+    return f"- {step.get('action', '?')} '{step.get('target', '')[:20]}' -> {'OK' if ok else 'FAIL'}: {reason[:limit]}"
+
+
+# Exact-match LRU of planned steps, keyed by a hash of the full user message
+_STEP_CACHE: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+_STEP_CACHE_SIZE = 1024
+_step_cache_lock = threading.Lock()
+
+
+def _step_cache_get(key: bytes) -> Optional[Dict[str, Any]]:
+    """Return a copy of a cached step and mark it as recently used."""
+    with _step_cache_lock:
+        step = _STEP_CACHE.get(key)
+        if step is None:
+            return None
+        _STEP_CACHE.move_to_end(key)
+    return copy.deepcopy(step)
+
+
+def _step_cache_put(key: bytes, step: Dict[str, Any]):
+    """Cache a parsed step (before its step_id is assigned)."""
+    step = copy.deepcopy(step)
+    with _step_cache_lock:
+        _STEP_CACHE[key] = step
+        _STEP_CACHE.move_to_end(key)
+        while len(_STEP_CACHE) > _STEP_CACHE_SIZE:
+            _STEP_CACHE.popitem(last=False)
+
+
 def plan_next_step(query: str, url: str, current_dom: Dict, 
                    executed_steps: List[Dict] = None, api_key: str = None) -> Dict[str, Any]:
     """
@@ -206,78 +409,74 @@ def plan_next_step(query: str, url: str, current_dom: Dict,
     if not api_key:
         raise ValueError("GROQ_API_KEY not set")
     
-    client = Groq(api_key=api_key)
-    
-    # Build context about current page
-    elements_summary = []
-    
-    # Sort nodes by score/relevance if possible, or just scan all
-    # For now, we scan all nodes but limit the output list size
+    # Build context about current page: score every meaningful element,
+    # then describe the best ones until the character budget is spent
+    viewport_h = (current_dom.get('viewport') or {}).get('height')
+    scored = []
     
-    # Filter for interactive or meaningful elements
-    candidates_list = []
-    interactive_tags = {'button', 'a', 'input', 'select', 'textarea', 'form', 'label', 'div', 'span'}
-    
-    for node in current_dom.get('nodes', []):
+    for idx, node in enumerate(current_dom.get('nodes', [])):
         tag = node.get('tag', '')
-        if tag in ['script', 'style', 'meta', 'link', 'noscript', 'img', 'svg', 'path']:
+        if tag in _SKIP_TAGS:
             continue
             
         text = (node.get('text') or '').strip()
         aria = (node.get('aria_label') or '').strip()
-        attrs = node.get('attributes', {})
-        node_id = node.get('node_id', 'unknown')
+        attrs = node.get('attributes') or {}
         
         # Skip empty non-interactive elements
         # Allow divs/spans only if they have text or handler behavior
-        if tag not in ['button', 'a', 'input', 'select', 'textarea'] and not text and not aria and not attrs.get('role'):
+        if tag not in _INTERACTIVE_TAGS and not text and not aria and not attrs.get('role'):
             continue
-            
-        # Build description
-        parts = [f"[ID:{node_id}]", tag]
         
+        score = _ROLE_WEIGHT.get(tag, _DEFAULT_ROLE_WEIGHT)
+        if viewport_h:
+            box = node.get('bounding_box') or {}
+            y = box.get('y', 0)
+            if y < viewport_h and y + box.get('h', 0) > 0:
+                score += 50
         if aria:
-            parts.append(f"aria:{aria[:40]}")
-        elif text:
-            parts.append(f"'{text[:40]}'")
-            
-        # Add extra attributes for better identification if ID/Text is weak
-        if attrs.get('name'):
-            parts.append(f"name:{attrs['name'][:30]}")
-        if attrs.get('placeholder'):
-            parts.append(f"ph:{attrs['placeholder'][:30]}")
-        if attrs.get('type'):
-            parts.append(f"type:{attrs['type']}")
-        if attrs.get('role'):
-            parts.append(f"role:{attrs['role']}")
-        if attrs.get('href') and tag == 'a':
-            parts.append(f"href:{attrs['href'][:40]}")
-        
-        desc = " ".join(parts)
-        candidates_list.append(desc)
-    
-    # Use up to 60 elements to give LLM enough context
-    context_limit = 60
-    elements_str = "\n".join(candidates_list[:context_limit])
-    
-    # Build compact history context
-    history = ""
-    if executed_steps:
-        history = "\nHistory:\n"
-        recent = executed_steps[-5:]  # Last 5 steps
-        for s in recent:
-            action = s.get('step', {}).get('action', '?')
-            target = s.get('step', {}).get('target', '')[:20]
-            result_status = "OK" if s.get('result', {}).get('ok') else "FAIL"
-            reason = s.get('result', {}).get('message', '')
-            
-            # Show more context, especially for warnings
-            if "WARNING" in reason or result_status == "FAIL":
-                 history += f"- {action} '{target}' -> {result_status}: {reason[:100]}\n"
-            else:
-                 history += f"- {action} '{target}' -> {result_status}: {reason[:60]}\n"
+            score += 20
+        if text:
+            score += 15
+        if attrs.get('data-testid'):
+            score += 10
+        scored.append((-score, idx, node, tag, text, aria, attrs))
+    
+    # Highest score first; ties keep document order
+    scored.sort(key=lambda item: (item[0], item[1]))
+    picked = []
+    budget = ELEMENT_CONTEXT_CHARS
+    for _, idx, node, tag, text, aria, attrs in scored:
+        desc = _describe_node(node.get('node_id', 'unknown'), tag, text, aria, attrs)
+        budget -= len(desc) + 1
+        if budget < 0:
+            break
+        picked.append((idx, desc))
+    
+    # Present the chosen elements in page order
+    picked.sort()
+    elements_str = "\n".join(desc for _, desc in picked)
     
-    user_message = f"Goal:{query}\nURL:{url}\nEls:\n{elements_str}{history}\nNext (JSON, include 'value' if typing):"
+    # Build compact history context from the last 5 steps
+    history_lines = [_history_line(entry) for entry in (executed_steps or [])[-5:]]
+    history = "\nHistory:\n" + "\n".join(history_lines) if history_lines else ""
+    
+    # Stable fields first and the element list (the most volatile part) last,
+    # so consecutive requests in a session share the longest possible prefix
+    user_message = f"Goal:{query}\nURL:{url}{history}\nEls:\n{elements_str}\nNext (JSON, include 'value' if typing):"
+    
+    # Waits often resend the exact same page and history. After a failed or
+    # no-op step, though, identical inputs mean the last answer didn't work,
+    # so the retry must get a fresh sample from the model instead.
+    last_result = (executed_steps or [{}])[-1].get('result') or {}
+    retrying = bool(executed_steps) and (not last_result.get('ok') or last_result.get('no_op'))
+    cache_key = hashlib.blake2b(user_message.encode(), digest_size=16).digest()
+    step = None if retrying else _step_cache_get(cache_key)
+    if step is not None:
+        step['step_id'] = f"s{len(executed_steps or []) + 1}"
+        return step
+    
+    client = _get_client(api_key)
 
     try:
         response = client.chat.completions.create(
@@ -290,18 +489,14 @@ def plan_next_step(query: str, url: str, current_dom: Dict,
             ],
             temperature=0.1,  # Lower for faster, more deterministic responses
             max_tokens=200,  # Reduced from 500 - single step doesn't need much
-            stream=False  # Explicitly disable streaming for faster response
+            stream=True  # Stop reading as soon as the step object is complete
         )
         
-        content = response.choices[0].message.content.strip()
-        
-        # Parse JSON
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
+        content = read_first_json_object(response)
         
         step = json.loads(content)
+        if isinstance(step, dict) and not retrying:
+            _step_cache_put(cache_key, step)
         
         # Add step_id
         step_num = len(executed_steps or []) + 1
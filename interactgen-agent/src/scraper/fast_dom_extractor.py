@@ -2,27 +2,68 @@
 Fast async DOM extractor using in-page JavaScript injection.
 Extracts DOM structure from already-open Playwright page in ~50-100ms.
 """
-import hashlib
+from collections.abc import Sequence
 from typing import Dict, List, Any
 
 
+# Stable node ID from "tag|text|x|y": two 32-bit FNV-1a lanes, one read
+# forwards and one backwards from a different offset basis, as 16 hex chars.
+# A single 32-bit lane collides too easily for _DOMIndex.by_id, which keeps
+# only the first node per ID.
+NODE_ID_JS = r'''(key) => {
+    let a = 2166136261, b = 3332679585;
+    for (let i = 0, j = key.length - 1; i < key.length; i++, j--) {
+        a = Math.imul(a ^ key.charCodeAt(i), 16777619) >>> 0;
+        b = Math.imul(b ^ key.charCodeAt(j), 16777619) >>> 0;
+    }
+    return a.toString(16).padStart(8, '0') + b.toString(16).padStart(8, '0');
+}'''
+
 # JavaScript code injected into page for fast DOM extraction
 DOM_EXTRACTION_JS = r'''() => {
-    const nodes = [];
+    const nodeId = __NODE_ID_JS__;
+    // Nodes go out as parallel columns rather than one object per node:
+    // the same keys repeated thousands of times made up most of the payload
+    const cols = {
+        node_id: [], tag: [], text: [], aria_label: [], xpath: [],
+        x: [], y: [], w: [], h: [], attributes: [], candidates: []
+    };
     const allElements = document.querySelectorAll('body *');
     
+    // Same-tag sibling position (1-based) per element, filled one parent at a
+    // time so each child list is scanned once instead of once per descendant
+    const siblingIndex = new Map();
+    const indexOf = (el) => {
+        let i = siblingIndex.get(el);
+        if (i !== undefined) return i;
+        const parent = el.parentElement;
+        if (!parent) return 1;
+        const counts = {};
+        for (const child of parent.children) {
+            counts[child.tagName] = (counts[child.tagName] || 0) + 1;
+            siblingIndex.set(child, counts[child.tagName]);
+        }
+        return siblingIndex.get(el);
+    };
+    
+    // Read every box up front, before any other per-element work, so layout
+    // is resolved in one pass. Boxes are the cheaper filter: display:none
+    // elements come back 0x0, so style is only resolved for elements that
+    // are on screen and big enough to matter.
+    const viewportHeight = window.innerHeight;
+    const rects = Array.from(allElements, el => el.getBoundingClientRect());
+    
     allElements.forEach((el, idx) => {
         try {
-            // Skip invisible elements
-            const style = getComputedStyle(el);
-            if (style.display === 'none' || style.visibility === 'hidden' || style.opacity === '0') return;
-            
-            // Get bounding box
-            const rect = el.getBoundingClientRect();
+            const rect = rects[idx];
             if (rect.width < 10 || rect.height < 10) return;
             
             // Skip elements outside viewport (with margin)
-            if (rect.bottom < -100 || rect.top > window.innerHeight + 100) return;
+            if (rect.bottom < -100 || rect.top > viewportHeight + 100) return;
+            
+            // Skip invisible elements
+            const style = getComputedStyle(el);
+            if (style.display === 'none' || style.visibility === 'hidden' || style.opacity === '0') return;
             
             // Get text content (limited to 100 chars for speed)
             let text = '';
@@ -40,122 +81,83 @@ DOM_EXTRACTION_JS = r'''() => {
                     xpath = part + xpath;
                     break;
                 }
-                let sibling = current.previousElementSibling;
-                let index = 1;
-                while (sibling) {
-                    if (sibling.tagName === current.tagName) index++;
-                    sibling = sibling.previousElementSibling;
-                }
-                part = `/${part}[${index}]`;
+                part = `/${part}[${indexOf(current)}]`;
                 xpath = part + xpath;
                 current = current.parentElement;
             }
             if (!xpath.startsWith('//')) xpath = '/' + xpath;
             
-            // Get selector candidates
+            // Get selector candidates as [type, value, prov, score]
             const candidates = [];
 
             // 1. Data Attributes (High reliability)
             ['data-testid', 'data-test', 'data-cy', 'data-id'].forEach(attr => {
                 if (el.hasAttribute(attr)) {
-                    candidates.push({
-                        type: 'css',
-                        value: `[${attr}="${el.getAttribute(attr)}"]`,
-                        prov: 'data-attr',
-                        score: 0.95
-                    });
+                    candidates.push(['css', `[${attr}="${el.getAttribute(attr)}"]`, 'data-attr', 0.95]);
                 }
             });
             
             // 2. ID selector
             if (el.id && !/\d{4,}/.test(el.id)) {
-                candidates.push({
-                    type: 'css',
-                    value: `#${el.id}`,
-                    prov: 'id',
-                    score: 0.9
-                });
+                candidates.push(['css', `#${el.id}`, 'id', 0.9]);
             }
 
             // 3. Aria-label selector
             const ariaLabel = el.getAttribute('aria-label');
             if (ariaLabel) {
-                candidates.push({
-                    type: 'css',
-                    value: `[aria-label="${ariaLabel.replace(/"/g, '\\"')}"]`,
-                    prov: 'aria',
-                    score: 0.85
-                });
+                candidates.push(['css', `[aria-label="${ariaLabel.replace(/"/g, '\\"')}"]`, 'aria', 0.85]);
             }
             
             // 4. Name attribute
             const name = el.getAttribute('name');
             if (name) {
-                candidates.push({
-                    type: 'css',
-                    value: `[name="${name}"]`,
-                    prov: 'name',
-                    score: 0.8
-                });
+                candidates.push(['css', `[name="${name}"]`, 'name', 0.8]);
             }
             
             // 5. Role attribute
             const role = el.getAttribute('role');
             if (role) {
-                candidates.push({
-                    type: 'css',
-                    value: `[role="${role}"]`,
-                    prov: 'role',
-                    score: 0.7
-                });
+                candidates.push(['css', `[role="${role}"]`, 'role', 0.7]);
             }
 
             // 6. Placeholder
             const ph = el.getAttribute('placeholder');
             if (ph) {
-                 candidates.push({
-                    type: 'css',
-                    value: `[placeholder="${ph.replace(/"/g, '\\"')}"]`,
-                    prov: 'placeholder',
-                    score: 0.75
-                });
+                 candidates.push(['css', `[placeholder="${ph.replace(/"/g, '\\"')}"]`, 'placeholder', 0.75]);
             }
             
             // 7. Text-based XPath (for buttons/links)
             if (text && text.length < 50 && ['BUTTON', 'A', 'LABEL', 'SPAN', 'DIV'].includes(el.tagName)) {
-                candidates.push({
-                    type: 'xpath',
-                    value: `//${el.tagName.toLowerCase()}[normalize-space(text())="${text.replace(/"/g, '\\"')}"]`,
-                    prov: 'text',
-                    score: 0.6
-                });
+                candidates.push(['xpath', `//${el.tagName.toLowerCase()}[normalize-space(text())="${text.replace(/"/g, '\\"')}"]`, 'text', 0.6]);
             }
             
-            nodes.push({
-                node_id: `n_${idx}`,
-                tag: el.tagName.toLowerCase(),
-                text: text,
-                aria_label: ariaLabel || null,
-                attributes: {
-                    id: el.id || null,
-                    class: el.className || null,
-                    name: name || null,
-                    role: role || null,
-                    type: el.getAttribute('type') || null,
-                    placeholder: el.getAttribute('placeholder') || null,
-                    href: el.getAttribute('href') || null,
-                    'data-testid': el.getAttribute('data-testid') || null
-                },
-                xpath: xpath,
-                bounding_box: {
-                    x: Math.round(rect.x),
-                    y: Math.round(rect.y),
-                    w: Math.round(rect.width),
-                    h: Math.round(rect.height)
-                },
-                visible: true,
-                candidates: candidates
-            });
+            // Stable ID from tag, text and position
+            const tag = el.tagName.toLowerCase();
+            const x = Math.round(rect.x), y = Math.round(rect.y);
+            
+            // Attribute values in ATTRIBUTE_KEYS order
+            const attributes = [
+                el.id || null,
+                el.className || null,
+                name || null,
+                role || null,
+                el.getAttribute('type') || null,
+                ph || null,
+                el.getAttribute('href') || null,
+                el.getAttribute('data-testid') || null
+            ];
+            
+            cols.node_id.push(nodeId(`${tag}|${text.slice(0, 80)}|${x}|${y}`));
+            cols.tag.push(tag);
+            cols.text.push(text);
+            cols.aria_label.push(ariaLabel || null);
+            cols.xpath.push(xpath);
+            cols.x.push(x);
+            cols.y.push(y);
+            cols.w.push(Math.round(rect.width));
+            cols.h.push(Math.round(rect.height));
+            cols.attributes.push(attributes);
+            cols.candidates.push(candidates);
         } catch (e) {
             // Skip problematic elements
         }
@@ -164,16 +166,84 @@ DOM_EXTRACTION_JS = r'''() => {
     return {
         url: location.href,
         timestamp: Date.now(),
-        nodes: nodes,
+        columns: cols,
         viewport: {
             width: window.innerWidth,
             height: window.innerHeight
         }
     };
-}'''
+}'''.replace('__NODE_ID_JS__', NODE_ID_JS)
+
+# Self-invoking form for CDP Runtime.evaluate, which takes an expression
+DOM_EXTRACTION_EXPR = f"({DOM_EXTRACTION_JS})()"
+
+# Field order of the per-node arrays in the extractor's columns
+ATTRIBUTE_KEYS = ('id', 'class', 'name', 'role', 'type', 'placeholder', 'href', 'data-testid')
+CANDIDATE_KEYS = ('type', 'value', 'prov', 'score')
 
 
-async def extract_dom_fast(page) -> Dict[str, Any]:
+class NodeTable(Sequence):
+    """
+    Columnar nodes from DOM_EXTRACTION_JS, read like a list of node dicts.
+    
+    Each row dict is built the first time it is accessed and kept, so nodes
+    that are never looked at cost nothing and repeated lookups return the
+    same (mutable) dict, as with a plain list.
+    """
+    __slots__ = ('_cols', '_rows')
+    
+    def __init__(self, cols: Dict[str, List]):
+        self._cols = cols
+        self._rows: List[Any] = [None] * len(cols['node_id'])
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self._rows)))]
+        row = self._rows[i]
+        if row is None:
+            c = self._cols
+            row = self._rows[i] = {
+                'node_id': c['node_id'][i],
+                'tag': c['tag'][i],
+                'text': c['text'][i],
+                'aria_label': c['aria_label'][i],
+                'attributes': dict(zip(ATTRIBUTE_KEYS, c['attributes'][i])),
+                'xpath': c['xpath'][i],
+                'bounding_box': {'x': c['x'][i], 'y': c['y'][i], 'w': c['w'][i], 'h': c['h'][i]},
+                'visible': True,
+                'candidates': [dict(zip(CANDIDATE_KEYS, cand)) for cand in c['candidates'][i]],
+            }
+        return row
+    
+    def column(self, name: str) -> List:
+        """Raw values of one field for every node, without building rows."""
+        return self._cols[name]
+
+
+# Only the node IDs of a fresh extraction, for cheap "did the page change"
+# checks; the rest of the columns never leave the page
+NODE_IDS_JS = f"() => ({DOM_EXTRACTION_JS})().columns.node_id"
+NODE_IDS_EXPR = f"({NODE_IDS_JS})()"
+
+
+def node_ids(snapshot: Dict[str, Any]) -> List[str]:
+    """Node IDs of a snapshot, read from the column when there is one."""
+    nodes = snapshot.get('nodes', [])
+    if isinstance(nodes, NodeTable):
+        return nodes.column('node_id')
+    return [n.get('node_id', '') for n in nodes]
+
+
+def _unpack(snapshot_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace the extractor's columns with a NodeTable under 'nodes'."""
+    snapshot_data['nodes'] = NodeTable(snapshot_data.pop('columns'))
+    return snapshot_data
+
+
+async def extract_dom_fast(page, cdp=None) -> Dict[str, Any]:
     """
     Extract DOM structure from an already-open Playwright page.
     
@@ -184,24 +254,26 @@ async def extract_dom_fast(page) -> Dict[str, Any]:
     
     Args:
         page: Playwright async page object (already navigated)
+        cdp: Optional CDP session for the page; when given, the script runs
+             through Runtime.evaluate on it instead of page.evaluate
     
     Returns:
-        Dict with nodes, url, timestamp, viewport
+        Dict with nodes (a NodeTable), url, timestamp, viewport
     """
     try:
         # Inject and execute JavaScript
-        snapshot_data = await page.evaluate(DOM_EXTRACTION_JS)
-        
-        # Generate stable node IDs based on content
-        for node in snapshot_data.get('nodes', []):
-            # Create stable ID from element properties
-            tag = node.get('tag', '')
-            text = node.get('text', '')[:80]
-            bbox = node.get('bounding_box', {})
-            s = f"{tag}|{text}|{bbox.get('x', 0)}|{bbox.get('y', 0)}"
-            node['node_id'] = hashlib.sha1(s.encode()).hexdigest()[:12]
+        if cdp is not None:
+            res = await cdp.send("Runtime.evaluate", {
+                "expression": DOM_EXTRACTION_EXPR,
+                "returnByValue": True,
+            })
+            if "exceptionDetails" in res:
+                raise RuntimeError(res["exceptionDetails"].get("text", "DOM extraction failed"))
+            snapshot_data = res["result"]["value"]
+        else:
+            snapshot_data = await page.evaluate(DOM_EXTRACTION_JS)
         
-        return snapshot_data
+        return _unpack(snapshot_data)
     
     except Exception as e:
         return {
@@ -212,6 +284,24 @@ async def extract_dom_fast(page) -> Dict[str, Any]:
         }
 
 
+async def extract_node_ids(page, cdp=None) -> List[str]:
+    """
+    Run the extractor in-page but transfer only the node ID column.
+    
+    Same arguments as extract_dom_fast. Errors are raised, not folded
+    into the result.
+    """
+    if cdp is not None:
+        res = await cdp.send("Runtime.evaluate", {
+            "expression": NODE_IDS_EXPR,
+            "returnByValue": True,
+        })
+        if "exceptionDetails" in res:
+            raise RuntimeError(res["exceptionDetails"].get("text", "DOM extraction failed"))
+        return res["result"]["value"]
+    return await page.evaluate(NODE_IDS_JS)
+
+
 def extract_dom_sync(page) -> Dict[str, Any]:
     """
     Synchronous version for sync Playwright pages.
@@ -219,14 +309,7 @@ def extract_dom_sync(page) -> Dict[str, Any]:
     try:
         snapshot_data = page.evaluate(DOM_EXTRACTION_JS)
         
-        for node in snapshot_data.get('nodes', []):
-            tag = node.get('tag', '')
-            text = node.get('text', '')[:80]
-            bbox = node.get('bounding_box', {})
-            s = f"{tag}|{text}|{bbox.get('x', 0)}|{bbox.get('y', 0)}"
-            node['node_id'] = hashlib.sha1(s.encode()).hexdigest()[:12]
-        
-        return snapshot_data
+        return _unpack(snapshot_data)
     
     except Exception as e:
         return {
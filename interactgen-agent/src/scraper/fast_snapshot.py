@@ -3,11 +3,11 @@ Fast Playwright-based DOM snapshot generator.
 Captures visible interactive elements and generates ranked selector candidates.
 """
 import hashlib
-import json
 import re
 import time
 import sys
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+import orjson
 from playwright.sync_api import sync_playwright, Page, ElementHandle
 
 
@@ -115,6 +115,9 @@ def snapshot(url: str, out_path: str, wait_sec: float = 0.8):
         url: URL to scrape
         out_path: Output path for snapshot JSON
         wait_sec: Wait time after networkidle for dynamic content
+    
+    Returns:
+        Snapshot dict (also written to out_path)
     """
     print(f"Creating snapshot of {url}...")
     
@@ -124,144 +127,176 @@ def snapshot(url: str, out_path: str, wait_sec: float = 0.8):
         page = browser.new_page()
         
         try:
-            # Navigate and wait for network idle
-            page.goto(url, wait_until='networkidle', timeout=30000)
+            return snapshot_page(page, url, out_path, wait_sec)
+        finally:
+            browser.close()
+
+
+# Cheap structural fingerprint: interactive element count plus the first 50
+FINGERPRINT_JS = """() => {
+    const els = [...document.querySelectorAll('button,a,input,select,textarea')];
+    return els.length + '|' + els.slice(0, 50).map(e =>
+        e.tagName + ':' + (e.getAttribute('aria-label') || '') + ':' +
+        (e.textContent || '').trim().slice(0, 40)
+    ).join(',');
+}"""
+
+
+def dom_fingerprint(page) -> str:
+    """Hash the page's interactive elements to detect an unchanged DOM."""
+    return hashlib.sha1(page.evaluate(FINGERPRINT_JS).encode()).hexdigest()
+
+
+def snapshot_page(page, url: str, out_path: Optional[str], wait_sec: float = 0.8, navigate: bool = True):
+    """
+    Capture visible nodes from an open page and write the snapshot.
+    
+    Pass navigate=False when the page is already loaded at url, and
+    out_path=None to keep the snapshot in memory only.
+    """
+    if navigate:
+        # Navigate and wait for network idle
+        page.goto(url, wait_until='networkidle', timeout=30000)
+    
+    # Additional wait for dynamic content
+    time.sleep(wait_sec)
+    
+    # Get all elements
+    els = page.query_selector_all("body *")
+    nodes = []
+    
+    print(f"Processing {len(els)} elements...")
+    
+    for el in els:
+        try:
+            # Skip if not visible
+            if not el.is_visible():
+                continue
             
-            # Additional wait for dynamic content
-            time.sleep(wait_sec)
+            # Get bounding box
+            box = el.bounding_box()
+            if not box:
+                continue
             
-            # Get all elements
-            els = page.query_selector_all("body *")
-            nodes = []
+            # Skip tiny elements (< 100px²)
+            area = box.get('width', 0) * box.get('height', 0)
+            if area < 100:
+                continue
             
-            print(f"Processing {len(els)} elements...")
+            # Get element properties
+            tag_name = el.evaluate("e => e.tagName").lower()
+            text = (el.inner_text() or "").strip()
             
-            for el in els:
-                try:
-                    # Skip if not visible
-                    if not el.is_visible():
-                        continue
-                    
-                    # Get bounding box
-                    box = el.bounding_box()
-                    if not box:
-                        continue
-                    
-                    # Skip tiny elements (< 100px²)
-                    area = box.get('width', 0) * box.get('height', 0)
-                    if area < 100:
-                        continue
-                    
-                    # Get element properties
-                    tag_name = el.evaluate("e => e.tagName").lower()
-                    text = (el.inner_text() or "").strip()
-                    
-                    # Generate XPath
-                    xpath = page.evaluate("""(e) => {
-                        let p = e;
-                        let path = '';
-                        while (p && p.nodeType === 1) {
-                            let i = 1;
-                            let s = p.previousElementSibling;
-                            while (s) {
-                                if (s.tagName === p.tagName) i++;
-                                s = s.previousElementSibling;
-                            }
-                            path = '/' + p.tagName.toLowerCase() + '[' + i + ']' + path;
-                            p = p.parentElement;
-                        }
-                        return path;
-                    }""", el)
-                    
-                    # Generate CSS path
-                    css_path = page.evaluate("""(e) => {
-                        let parts = [];
-                        let cur = e;
-                        while (cur && cur.nodeType === 1) {
-                            let part = cur.tagName.toLowerCase();
-                            if (cur.id) {
-                                part += '#' + cur.id;
-                                parts.unshift(part);
-                                break;
-                            }
-                            if (cur.className) {
-                                let classes = String(cur.className).split(/\\s+/).slice(0, 3).join('.');
-                                if (classes) part += '.' + classes;
-                            }
-                            parts.unshift(part);
-                            cur = cur.parentElement;
-                        }
-                        return parts.join(' > ');
-                    }""", el)
-                    
-                    # Get attributes
-                    attributes = page.evaluate("""(e) => {
-                        const a = {};
-                        for (const attr of e.attributes) {
-                            a[attr.name] = attr.value;
-                        }
-                        return a;
-                    }""", el)
-                    
-                    # Generate node ID
-                    nid = node_id(tag_name, text, xpath, box)
-                    
-                    # Generate selector candidates
-                    cands = generate_candidates(el, page)
-                    
-                    # Create node object
-                    node = {
-                        "node_id": nid,
-                        "tag": tag_name,
-                        "text": text[:500],  # Limit text length
-                        "attributes": attributes,
-                        "aria_label": el.get_attribute("aria-label"),
-                        "xpath": xpath,
-                        "css_path": css_path,
-                        "bounding_box": {
-                            "x": box['x'],
-                            "y": box['y'],
-                            "w": box['width'],
-                            "h": box['height']
-                        },
-                        "visible": True,
-                        "semantic_label": None,
-                        "candidates": cands,
-                        "parent_id": None
+            # Generate XPath
+            xpath = page.evaluate("""(e) => {
+                let p = e;
+                let path = '';
+                while (p && p.nodeType === 1) {
+                    let i = 1;
+                    let s = p.previousElementSibling;
+                    while (s) {
+                        if (s.tagName === p.tagName) i++;
+                        s = s.previousElementSibling;
                     }
-                    
-                    nodes.append(node)
-                
-                except Exception as e:
-                    # Skip problematic elements
-                    continue
+                    path = '/' + p.tagName.toLowerCase() + '[' + i + ']' + path;
+                    p = p.parentElement;
+                }
+                return path;
+            }""", el)
             
-            print(f"Captured {len(nodes)} visible elements with candidates")
+            # Generate CSS path
+            css_path = page.evaluate("""(e) => {
+                let parts = [];
+                let cur = e;
+                while (cur && cur.nodeType === 1) {
+                    let part = cur.tagName.toLowerCase();
+                    if (cur.id) {
+                        part += '#' + cur.id;
+                        parts.unshift(part);
+                        break;
+                    }
+                    if (cur.className) {
+                        let classes = String(cur.className).split(/\\s+/).slice(0, 3).join('.');
+                        if (classes) part += '.' + classes;
+                    }
+                    parts.unshift(part);
+                    cur = cur.parentElement;
+                }
+                return parts.join(' > ');
+            }""", el)
             
-            # Get accessibility tree (optional)
-            ax_tree = None
-            try:
-                ax_tree = page.accessibility.snapshot()
-            except:
-                pass
+            # Get attributes
+            attributes = page.evaluate("""(e) => {
+                const a = {};
+                for (const attr of e.attributes) {
+                    a[attr.name] = attr.value;
+                }
+                return a;
+            }""", el)
             
-            # Create snapshot object
-            snapshot_obj = {
-                "url": url,
-                "timestamp": time.time(),
-                "nodes": nodes,
-                "ax_tree": ax_tree
-            }
+            # Generate node ID
+            nid = node_id(tag_name, text, xpath, box)
             
-            # Write to file
-            with open(out_path, 'w', encoding='utf-8') as f:
-                json.dump(snapshot_obj, f, indent=2)
+            # Generate selector candidates
+            cands = generate_candidates(el, page)
             
-            print(f"Snapshot saved to {out_path}")
-            print(f"File size: {len(json.dumps(snapshot_obj)) / 1024:.1f} KB")
+            # Create node object
+            node = {
+                "node_id": nid,
+                "tag": tag_name,
+                "text": text[:500],  # Limit text length
+                "attributes": attributes,
+                "aria_label": el.get_attribute("aria-label"),
+                "xpath": xpath,
+                "css_path": css_path,
+                "bounding_box": {
+                    "x": box['x'],
+                    "y": box['y'],
+                    "w": box['width'],
+                    "h": box['height']
+                },
+                "visible": True,
+                "semantic_label": None,
+                "candidates": cands,
+                "parent_id": None
+            }
             
-        finally:
-            browser.close()
+            nodes.append(node)
+        
+        except Exception as e:
+            # Skip problematic elements
+            continue
+    
+    print(f"Captured {len(nodes)} visible elements with candidates")
+    
+    # Get accessibility tree (optional)
+    ax_tree = None
+    try:
+        ax_tree = page.accessibility.snapshot()
+    except:
+        pass
+    
+    # Create snapshot object
+    snapshot_obj = {
+        "url": url,
+        "timestamp": time.time(),
+        "nodes": nodes,
+        "ax_tree": ax_tree
+    }
+    
+    if out_path is None:
+        return snapshot_obj
+    
+    # Write to file (single C-level encode, reused for the size report)
+    data = orjson.dumps(snapshot_obj, option=orjson.OPT_INDENT_2)
+    with open(out_path, 'wb') as f:
+        f.write(data)
+    
+    print(f"Snapshot saved to {out_path}")
+    print(f"File size: {len(data) / 1024:.1f} KB")
+    
+    return snapshot_obj
+    
 
 
 if __name__ == "__main__":
@@ -3,14 +3,11 @@ Vision-enhanced selector with multi-modal approach.
 Combines DOM analysis with computer vision for robust element selection.
 """
 import json
-import sys
-import os
 import argparse
 from typing import List, Dict, Any, Optional
 from Levenshtein import distance as levenshtein_distance
-import sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.selector_history import get_boost_score
+
+from src.utils.selector_history import get_boost_score
 
 
 def score_dom_candidate(candidate: Dict, node: Dict, target: str, match_count: int = 1) -> float:
@@ -0,0 +1,29 @@
+"""
+Page-side JS helpers shared by the sync and async executors.
+"""
+
+# JS fallbacks for click/type, installed once per page (and into every later
+# document via add_init_script) so each call only ships a one-line invocation.
+# Selectors and values are passed as evaluate() arguments, so quotes in them
+# can't break parsing.
+JS_HELPERS = '''(() => {
+    if (window.__ig_resolve) return;
+    window.__ig_resolve = (sel) => sel.startsWith('/')
+        ? document.evaluate(sel, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+        : document.querySelector(sel);
+    window.__ig_click = (sel) => {
+        const el = window.__ig_resolve(sel);
+        if (!el) return false;
+        el.click();
+        return true;
+    };
+    window.__ig_fill = (sel, val) => window.__ig_fill_el(window.__ig_resolve(sel), val);
+    window.__ig_fill_el = (el, val) => {
+        if (!el) return false;
+        el.focus();
+        el.value = val;
+        el.dispatchEvent(new Event('input', { bubbles: true, cancelable: true }));
+        el.dispatchEvent(new Event('change', { bubbles: true, cancelable: true }));
+        return true;
+    };
+})();'''
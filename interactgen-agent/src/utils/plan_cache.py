@@ -0,0 +1,87 @@
+"""
+On-disk LRU cache for planner output.
+"""
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import orjson
+
+
+def plan_cache_key(*parts: Any) -> str:
+    """Hash the planner inputs into a stable cache key."""
+    raw = orjson.dumps(parts, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.sha1(raw).hexdigest()
+
+
+class PlanCache:
+    """
+    Directory of JSON files named by key, bounded by entry count.
+
+    File mtimes act as the LRU order: hits touch the file and puts evict
+    the oldest entries once over max_entries. Entries also expire
+    max_age_sec after they were stored, however often they are hit, so a
+    bad or outdated plan can't replay forever.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000,
+                 max_age_sec: Optional[float] = None):
+        self.path = Path(path).expanduser()
+        self.max_entries = max_entries
+        self.max_age_sec = max_age_sec
+        self._lock = threading.Lock()
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached value and mark it as recently used."""
+        f = self._file(key)
+        try:
+            entry = orjson.loads(f.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+        if not isinstance(entry, dict) or "created" not in entry:
+            return None
+        if self.max_age_sec is not None and time.time() - entry["created"] > self.max_age_sec:
+            try:
+                f.unlink()
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(f)
+        except OSError:
+            pass
+        return entry["value"]
+
+    def put(self, key: str, value: Any):
+        """Store a value, evicting least recently used entries."""
+        f = self._file(key)
+        tmp = f.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        # Creation time is stored in the entry, since hits move the mtime
+        tmp.write_bytes(orjson.dumps({"created": time.time(), "value": value}))
+        os.replace(tmp, f)
+        with self._lock:
+            entries = list(self.path.glob("*.json"))
+            if len(entries) <= self.max_entries:
+                return
+            stamped = []
+            for p in entries:
+                try:
+                    stamped.append((p.stat().st_mtime, p))
+                except OSError:
+                    pass
+            stamped.sort()
+            for _, old in stamped[:len(stamped) - self.max_entries]:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.path.glob("*.json"))
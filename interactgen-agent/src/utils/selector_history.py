@@ -3,10 +3,14 @@ Selector history tracking for learning from successful selectors.
 """
 import json
 import os
+import threading
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Optional
 from pathlib import Path
 
+# Score bonus for a selector that has succeeded before
+HISTORY_BOOST = 0.15
+
 
 class SelectorHistory:
     """File-based JSON store for selector success tracking."""
@@ -15,6 +19,9 @@ class SelectorHistory:
         self.history_file = Path(history_file)
         self.history_file.parent.mkdir(parents=True, exist_ok=True)
         self.data = self._load()
+        # While a batch is open, updates only mark the data dirty
+        self._batch_depth = 0
+        self._dirty = False
     
     def _load(self) -> Dict:
         """Load history from file."""
@@ -58,16 +65,54 @@ class SelectorHistory:
             entry["failure_count"] += 1
             entry["last_failure_ts"] = datetime.now().isoformat()
         
-        self._save()
+        if self._batch_depth:
+            self._dirty = True
+        else:
+            self._save()
     
     def get_boost_score(self, node_id: str, selector: str) -> float:
         """Get boost score based on success history."""
         success_count = self.get_success_count(node_id, selector)
-        return 0.15 if success_count > 0 else 0.0
+        return HISTORY_BOOST if success_count > 0 else 0.0
+    
+    def success_counts(self) -> Dict[str, int]:
+        """Copy of every selector's success count, keyed "node_id:selector"."""
+        return {key: entry.get("success_count", 0) for key, entry in self.data.items()}
+
+
+class SelectorHistoryBatch:
+    """
+    Defer history writes until the block exits.
+    
+    update_success() calls made inside the block (directly or through
+    record()) only update memory; the file is written once on exit.
+    Batches nest; the outermost one flushes.
+    """
+    
+    def __init__(self, history: Optional[SelectorHistory] = None):
+        self.history = history or get_history()
+    
+    def __enter__(self) -> "SelectorHistoryBatch":
+        self.history._batch_depth += 1
+        return self
+    
+    def record(self, node_id: str, selector: str, ok: bool):
+        """Record a selector outcome."""
+        self.history.update_success(node_id, selector, ok)
+    
+    def __exit__(self, *exc):
+        history = self.history
+        history._batch_depth -= 1
+        if not history._batch_depth and history._dirty:
+            history._dirty = False
+            history._save()
+        return False
 
 
 # Global instance
 _history = None
+# Success counts frozen for the current thread by run_with_success_counts()
+_frozen = threading.local()
 
 def get_history() -> SelectorHistory:
     """Get global selector history instance."""
@@ -79,9 +124,31 @@ def get_history() -> SelectorHistory:
 
 def get_success_count(node_id: str, selector: str) -> int:
     """Get success count for a selector."""
+    counts = getattr(_frozen, "counts", None)
+    if counts is not None:
+        return counts.get(f"{node_id}:{selector}", 0)
     return get_history().get_success_count(node_id, selector)
 
 
+def success_counts() -> Dict[str, int]:
+    """Snapshot of the global history's success counts."""
+    return get_history().success_counts()
+
+
+def run_with_success_counts(counts: Dict[str, int], fn: Callable, *args) -> Any:
+    """
+    Call fn with history lookups in this thread reading `counts`.
+    
+    Lets background selection score against the history as it stood when
+    the work was submitted, independent of updates made meanwhile.
+    """
+    _frozen.counts = counts
+    try:
+        return fn(*args)
+    finally:
+        _frozen.counts = None
+
+
 def update_success(node_id: str, selector: str, ok: bool):
     """Update selector success/failure."""
     get_history().update_success(node_id, selector, ok)
@@ -89,4 +156,4 @@ def update_success(node_id: str, selector: str, ok: bool):
 
 def get_boost_score(node_id: str, selector: str) -> float:
     """Get boost score based on success history."""
-    return get_history().get_boost_score(node_id, selector)
+    return HISTORY_BOOST if get_success_count(node_id, selector) > 0 else 0.0
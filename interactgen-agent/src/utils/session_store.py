@@ -0,0 +1,178 @@
+"""
+Bounded in-memory session storage for the chatbot backend.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import orjson
+
+_ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# History kept per session; older entries are dropped and only counted
+MAX_MESSAGES = 200
+MAX_STEPS = 50
+
+
+def _ring(maxlen: int):
+    return field(default_factory=lambda: deque(maxlen=maxlen), repr=False)
+
+
+@dataclass(slots=True)
+class SessionState:
+    """
+    One chatbot session.
+
+    Every message/step/result is encoded once when it is appended, so
+    to_json() only joins bytes instead of re-walking the whole history.
+    Messages, steps and results are ring buffers; the number dropped is
+    reported as steps_dropped / results_dropped.
+    """
+    session_id: str
+    query: str
+    url: str
+    created_at: str
+    status: str = "pending"
+    error: Optional[str] = None
+    step_count: int = 0
+    result_count: int = 0
+    _messages: Deque[bytes] = _ring(MAX_MESSAGES)
+    _steps: Deque[bytes] = _ring(MAX_STEPS)
+    _results: Deque[bytes] = _ring(MAX_STEPS)
+
+    def add_message(self, role: str, content: str, timestamp: str):
+        """Append a chat message."""
+        self._messages.append(orjson.dumps(
+            {"role": role, "content": content, "timestamp": timestamp}
+        ))
+
+    def add_step(self, step: Dict[str, Any]):
+        """Append a planned step; encode it after it is fully populated."""
+        self.step_count += 1
+        self._steps.append(orjson.dumps(step, option=_ORJSON_OPTS))
+
+    def add_result(self, result: Dict[str, Any]):
+        """Append an execution result."""
+        self.result_count += 1
+        self._results.append(orjson.dumps(result, option=_ORJSON_OPTS))
+
+    def to_json(self) -> bytes:
+        """Serialize the session in the same shape as the old session dict."""
+        head = {
+            "session_id": self.session_id,
+            "query": self.query,
+            "url": self.url,
+            "status": self.status,
+            "created_at": self.created_at,
+        }
+        if self.error is not None:
+            head["error"] = self.error
+        if self.step_count > len(self._steps):
+            head["steps_dropped"] = self.step_count - len(self._steps)
+        if self.result_count > len(self._results):
+            head["results_dropped"] = self.result_count - len(self._results)
+        return b"".join((
+            orjson.dumps(head)[:-1],
+            b',"messages":[', b",".join(self._messages),
+            b'],"steps":[', b",".join(self._steps),
+            b'],"results":[', b",".join(self._results),
+            b"]}",
+        ))
+
+
+class SessionStore:
+    """
+    Size-capped LRU split into lock-guarded segments.
+
+    Entries idle for longer than ttl_sec are dropped as well. Segments are
+    kept in access order, so expired entries are always at the front.
+    """
+
+    def __init__(self, max_sessions: int = 10_000, segments: int = 16,
+                 ttl_sec: Optional[float] = None,
+                 on_evict: Optional[Callable[[str, Any], None]] = None):
+        if segments & (segments - 1):
+            raise ValueError("segments must be a power of two")
+        self._mask = segments - 1
+        self._segment_cap = max(1, max_sessions // segments)
+        self._ttl = ttl_sec
+        self._on_evict = on_evict
+        # session_id -> (session, last access time)
+        self._segments = [OrderedDict() for _ in range(segments)]
+        self._locks = [threading.Lock() for _ in range(segments)]
+
+    def _segment(self, session_id: str) -> int:
+        """Pick the segment index for a session ID."""
+        return hash(session_id) & self._mask
+
+    def _expire(self, seg: OrderedDict, now: float, evicted: List[Tuple[str, Any]]):
+        """Pop idle entries from the front of a segment."""
+        if self._ttl is None:
+            return
+        deadline = now - self._ttl
+        while seg:
+            session_id, (session, stamp) = next(iter(seg.items()))
+            if stamp > deadline:
+                break
+            seg.popitem(last=False)
+            evicted.append((session_id, session))
+
+    def _notify(self, evicted: List[Tuple[str, Any]]):
+        """Run the eviction callback outside the segment lock."""
+        if self._on_evict is not None:
+            for session_id, session in evicted:
+                self._on_evict(session_id, session)
+
+    def get(self, session_id: str) -> Optional[Any]:
+        """Return a session and mark it as recently used."""
+        idx = self._segment(session_id)
+        now = time.monotonic()
+        evicted: List[Tuple[str, Any]] = []
+        with self._locks[idx]:
+            seg = self._segments[idx]
+            self._expire(seg, now, evicted)
+            entry = seg.get(session_id)
+            if entry is not None:
+                seg[session_id] = (entry[0], now)
+                seg.move_to_end(session_id)
+        self._notify(evicted)
+        return entry[0] if entry is not None else None
+
+    def touch(self, session_id: str) -> bool:
+        """Refresh a session's idle timer; False if it was already evicted."""
+        return self.get(session_id) is not None
+
+    def put(self, session_id: str, session: Any):
+        """Insert or replace a session, evicting the least recently used."""
+        idx = self._segment(session_id)
+        now = time.monotonic()
+        evicted: List[Tuple[str, Any]] = []
+        with self._locks[idx]:
+            seg = self._segments[idx]
+            seg[session_id] = (session, now)
+            seg.move_to_end(session_id)
+            self._expire(seg, now, evicted)
+            while len(seg) > self._segment_cap:
+                old_id, (old_session, _) = seg.popitem(last=False)
+                evicted.append((old_id, old_session))
+        self._notify(evicted)
+
+    def pop(self, session_id: str) -> Optional[Any]:
+        """Remove and return a session."""
+        idx = self._segment(session_id)
+        with self._locks[idx]:
+            entry = self._segments[idx].pop(session_id, None)
+        return entry[0] if entry is not None else None
+
+    def __contains__(self, session_id: str) -> bool:
+        idx = self._segment(session_id)
+        with self._locks[idx]:
+            entry = self._segments[idx].get(session_id)
+        if entry is None:
+            return False
+        return self._ttl is None or entry[1] > time.monotonic() - self._ttl
+
+    def __len__(self) -> int:
+        return sum(len(seg) for seg in self._segments)
@@ -0,0 +1,45 @@
+"""
+Byte-capped LRU cache for DOM snapshots shared across queries.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import orjson
+
+
+class SnapshotCache:
+    """LRU of snapshot dicts bounded by their approximate JSON size."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a cached snapshot and mark it as recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, snapshot: Dict):
+        """Cache a snapshot, evicting old entries to stay under max_bytes."""
+        size = len(orjson.dumps(snapshot))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (snapshot, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
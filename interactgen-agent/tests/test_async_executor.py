@@ -0,0 +1,231 @@
+"""
+Unit tests for the async executor's selector lookups.
+"""
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.executor.async_executor import (
+    _find_best_selector_fallback, _first_visible, _index_dom, _node_by_id,
+    execute_step_async, find_best_selector, select_by_text,
+)
+
+
+def make_dom():
+    return {
+        "nodes": [
+            {"node_id": "n1", "text": "Sign Up", "candidates": [{"value": "#signup", "score": 0.9}]},
+            {"node_id": "n2", "text": "Log In", "aria_label": "Login", "xpath": "//a[2]"},
+            {"node_id": "n3", "text": "", "attributes": {"name": "email"},
+             "candidates": [{"value": "input[name='email']", "score": 0.8}]},
+        ]
+    }
+
+
+def test_index_is_reused_per_dom():
+    """The same snapshot object is only indexed once."""
+    dom = make_dom()
+    assert _index_dom(dom) is _index_dom(dom)
+    assert _index_dom(make_dom()) is not _index_dom(dom)
+
+
+def test_node_by_id():
+    """Nodes are looked up by ID without scanning."""
+    dom = make_dom()
+    assert _node_by_id(dom)["n2"] is dom["nodes"][1]
+    assert "missing" not in _node_by_id(dom)
+
+
+def test_select_by_text():
+    """Text and aria matches return the node's candidate or XPath."""
+    dom = make_dom()
+    assert select_by_text("sign up", dom) == "#signup"
+    assert select_by_text("LOGIN", dom) == "//a[2]"
+
+
+def test_fallback_returns_top_candidate():
+    """The fallback scorer returns the best candidate of a matching node."""
+    dom = make_dom()
+    dom["nodes"][0]["candidates"].append({"value": "button.signup", "score": 0.2})
+    assert _find_best_selector_fallback("Sign up", dom) == "#signup"
+
+
+def test_find_best_selector_picks_highest_score():
+    """The best-scoring candidate wins; ties keep the earliest one."""
+    dom = {"nodes": [
+        {"node_id": "x1", "text": "Submit", "visible": True,
+         "candidates": [{"type": "css", "value": "button.a", "prov": "class"}]},
+        {"node_id": "x2", "text": "Submit", "visible": True,
+         "candidates": [{"type": "css", "value": "#submit", "prov": "id"},
+                        {"type": "css", "value": "#submit2", "prov": "id"}]},
+    ]}
+    assert find_best_selector("submit", dom) == "#submit"
+    assert find_best_selector("", dom) is None
+    # Results are memoized on the snapshot's index
+    assert _index_dom(dom).selectors == {"submit": "#submit"}
+
+
+class FakeLocator:
+    """Becomes visible after `delay` seconds, or never when delay is None."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.first = self
+
+    async def wait_for(self, state, timeout):
+        if self.delay is None or self.delay * 1000 > timeout:
+            await asyncio.sleep(timeout / 1000)
+            raise TimeoutError(state)
+        await asyncio.sleep(self.delay)
+
+
+class FakePage:
+    def __init__(self, delays):
+        self.delays = delays
+
+    def locator(self, sel):
+        return FakeLocator(self.delays[sel])
+
+
+def test_first_visible_prefers_priority():
+    """A faster lower-priority hit waits for better candidates to settle."""
+    page = FakePage({"a": 0.05, "b": 0.0, "c": None})
+    assert asyncio.run(_first_visible(page, ["a", "b", "c"], timeout_ms=200)) == 0
+
+
+def test_first_visible_skips_failures():
+    """Failed probes fall through to the next visible selector."""
+    page = FakePage({"a": None, "b": 0.01, "c": 0.0})
+    assert asyncio.run(_first_visible(page, ["a", "b", "c"], timeout_ms=50)) == 1
+    assert asyncio.run(_first_visible(FakePage({"a": None}), ["a"], timeout_ms=10)) is None
+
+
+class MissingLocator:
+    """Locator whose element is not on the page."""
+
+    def __init__(self):
+        self.first = self
+
+    async def wait_for(self, state, timeout):
+        raise TimeoutError(state)
+
+    async def click(self, trial=False, timeout=None):
+        raise TimeoutError("click")
+
+
+class MissingPage:
+    """Page where no selector matches, so the JS click finds nothing too."""
+
+    def __init__(self):
+        self.clicked = []
+
+    def locator(self, sel):
+        return MissingLocator()
+
+    async def add_init_script(self, js):
+        pass
+
+    async def evaluate(self, js, arg=None):
+        if arg is not None:
+            self.clicked.append(arg)
+        return False
+
+
+def test_click_on_missing_element_fails():
+    """A JS click that finds no element is a failure, not 'Clicked (JS)'."""
+    dom = {"nodes": [{"node_id": "n1", "text": "Sign Up", "candidates": [
+        {"value": "#gone", "score": 0.9}, {"value": "#other", "score": 0.5}]}]}
+    step = {"action": "click", "target": "Sign Up", "element_id": "n1"}
+    result = asyncio.run(execute_step_async(MissingPage(), step, dom))
+    assert not result["ok"]
+    assert "after trying 2 selectors" in result["message"]
+
+
+class TrialLocator(MissingLocator):
+    """Fails the trial click when not actionable, otherwise clicks."""
+
+    def __init__(self, page, sel):
+        super().__init__()
+        self.page, self.sel = page, sel
+
+    async def click(self, trial=False, timeout=None):
+        if self.sel not in self.page.actionable:
+            raise TimeoutError("not actionable")
+        if not trial:
+            self.page.clicked.append(self.sel)
+
+
+class TrialPage(MissingPage):
+    def __init__(self, actionable):
+        super().__init__()
+        self.actionable = actionable
+
+    def locator(self, sel):
+        return TrialLocator(self, sel)
+
+
+def test_failed_trial_click_moves_to_next_candidate():
+    """A candidate that fails the trial is skipped, not force-clicked via JS."""
+    dom = {"nodes": [{"node_id": "n1", "text": "Sign Up", "candidates": [
+        {"value": "#covered", "score": 0.9}, {"value": "#signup", "score": 0.5}]}]}
+    step = {"action": "click", "target": "Sign Up", "element_id": "n1"}
+    page = TrialPage(actionable={"#signup"})
+    result = asyncio.run(execute_step_async(page, step, dom))
+    assert result["ok"]
+    assert result["message"].startswith("Clicked: Sign Up")
+    assert page.clicked == ["#signup"]
+
+
+class OverlayLocator(MissingLocator):
+    """Element behind an overlay: Playwright clicks time out, JS clicks work."""
+
+    def __init__(self, page):
+        super().__init__()
+        self.page = page
+
+    async def click(self, trial=False, timeout=None):
+        self.page.clicks.append((trial, timeout))
+        raise TimeoutError("intercepted")
+
+
+class OverlayPage(MissingPage):
+    def __init__(self):
+        super().__init__()
+        self.clicks = []
+
+    def locator(self, sel):
+        return OverlayLocator(self)
+
+    async def evaluate(self, js, arg=None):
+        return True
+
+
+def test_lone_candidate_gets_full_timeout_and_js_fallback():
+    """The only candidate skips the trial and still falls back to a JS click."""
+    dom = {"nodes": [{"node_id": "n1", "text": "Sign Up",
+                      "candidates": [{"value": "#signup", "score": 0.9}]}]}
+    step = {"action": "click", "target": "Sign Up", "element_id": "n1"}
+    page = OverlayPage()
+    result = asyncio.run(execute_step_async(page, step, dom))
+    assert result["ok"]
+    assert result["message"] == "Clicked (JS): Sign Up"
+    assert page.clicks == [(False, 2000)]
+
+
+def test_selector_equal_to_node_xpath_is_not_tried_twice():
+    """A step selector matching the node's XPath promotes the XPath locator."""
+    dom = {"nodes": [{"node_id": "n1", "text": "Log In", "xpath": "//a[2]",
+                      "candidates": [{"value": "#login", "score": 0.9}]}]}
+    step = {"action": "click", "target": "Log In", "element_id": "n1", "selector": "//a[2]"}
+    result = asyncio.run(execute_step_async(TrialPage(actionable=set()), step, dom))
+    assert "after trying 2 selectors" in result["message"]
+
+    page = TrialPage(actionable={"#login", "xpath=//a[2]"})
+    assert asyncio.run(execute_step_async(page, step, dom))["ok"]
+    assert page.clicked == ["xpath=//a[2]"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
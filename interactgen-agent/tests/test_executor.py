@@ -0,0 +1,114 @@
+"""
+Unit tests for the sync executor's candidate probing.
+"""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+from src.executor.executor import order_candidates, validate_step
+
+
+class FakeLocator:
+    """Locator over a set of selectors; visible if any of them is."""
+
+    def __init__(self, page, selectors):
+        self.page = page
+        self.selectors = selectors
+        self.first = self
+
+    def or_(self, other):
+        return FakeLocator(self.page, self.selectors + other.selectors)
+
+    def is_visible(self):
+        return any(s in self.page.visible for s in self.selectors)
+
+    def wait_for(self, state, timeout):
+        self.page.waits.append(timeout)
+        if not self.is_visible():
+            raise PlaywrightTimeout("not visible")
+
+
+class FakePage:
+    def __init__(self, visible):
+        self.visible = visible
+        self.waits = []
+
+    def locator(self, sel):
+        return FakeLocator(self, [sel])
+
+    def wait_for_url(self, predicate, wait_until, timeout):
+        self.waits.append(timeout)
+        # A pending navigation commits while the validator waits
+        self.url = getattr(self, "next_url", self.url)
+        if not predicate(self.url):
+            raise PlaywrightTimeout("url")
+
+
+def cands(*values):
+    return [{"value": v, "type": "css"} for v in values]
+
+
+def test_visible_candidates_go_first():
+    """One combined wait, then visible candidates keep the full timeout."""
+    page = FakePage({"#b"})
+    order = order_candidates(page, cands("#a", "#b", "#c"), 3000)
+    assert [(c["value"], t) for c, t in order] == [("#b", 3000), ("#a", 250), ("#c", 250)]
+    assert page.waits == [3000]
+
+
+def test_nothing_visible_fails_fast():
+    """With no visible match every candidate gets the short timeout."""
+    order = order_candidates(FakePage(set()), cands("#a", "#b"), 3000)
+    assert [t for _, t in order] == [250, 250]
+
+
+def test_single_candidate_is_not_probed():
+    """A lone candidate skips the probe and keeps the full timeout."""
+    page = FakePage(set())
+    assert order_candidates(page, cands("#a"), 3000) == [(cands("#a")[0], 3000)]
+    assert page.waits == []
+
+
+def test_validate_step_dispatch():
+    """Validators are looked up by type; unknown types pass."""
+    page = FakePage(set())
+    page.url = "https://Example.com/Cart"
+    assert validate_step(page, {"type": "url_contains", "value": "/cart"})
+    assert not validate_step(page, {"type": "url_contains", "value": "/checkout"})
+    assert validate_step(page, {"type": "presence"})
+    assert validate_step(page, {"type": "something_new"})
+    # Handler errors count as a failed validation
+    assert not validate_step(page, {"type": "text_contains", "text_contains": "x"})
+
+
+def test_url_validator_waits_for_navigation():
+    """url_contains waits for a navigation the action started."""
+    page = FakePage(set())
+    page.url = "https://example.com/login"
+    page.next_url = "https://example.com/account"
+    assert validate_step(page, {"type": "url_contains", "value": "/account"})
+    assert page.waits == [2000]
+
+    page.waits = []
+    assert validate_step(page, {"type": "url_contains", "value": "example.com"})
+    assert page.waits == []
+
+
+class TextPage(FakePage):
+    def get_by_text(self, text):
+        return FakeLocator(self, [text])
+
+
+def test_text_validator_waits_for_text():
+    """text_contains waits for the text instead of checking once."""
+    page = TextPage({"Welcome back"})
+    assert validate_step(page, {"type": "text_contains", "text_contains": "Welcome back"})
+    assert not validate_step(page, {"type": "text_contains", "text_contains": "Error"})
+    assert page.waits == [2000, 2000]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+"""
+Unit tests for the fast DOM extractor's columnar payload.
+"""
+import asyncio
+import json
+import pytest
+import shutil
+import subprocess
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scraper.fast_dom_extractor import (
+    NODE_ID_JS, NODE_IDS_EXPR, NodeTable, extract_dom_sync, extract_node_ids, node_ids,
+)
+
+
+def make_payload():
+    return {
+        "url": "http://x",
+        "timestamp": 1,
+        "viewport": {"width": 800, "height": 600},
+        "columns": {
+            "node_id": ["0000000a", "0000000b"],
+            "tag": ["button", "input"],
+            "text": ["Sign Up", ""],
+            "aria_label": [None, "Email"],
+            "xpath": ["/html[1]/body[1]/button[1]", "//*[@id=\"email\"]"],
+            "x": [10, 10], "y": [20, 60], "w": [100, 200], "h": [30, 30],
+            "attributes": [
+                [None, "btn", None, None, "submit", None, None, "signup"],
+                ["email", None, "email", None, "email", "you@x.com", None, None],
+            ],
+            "candidates": [
+                [["css", "[data-testid=\"signup\"]", "data-attr", 0.95]],
+                [["css", "#email", "id", 0.9], ["css", "[name=\"email\"]", "name", 0.8]],
+            ],
+        },
+    }
+
+
+class FakePage:
+    def evaluate(self, js):
+        return make_payload()
+
+
+def test_extract_dom_sync_builds_node_rows():
+    """Columns come back as node dicts in the original layout."""
+    dom = extract_dom_sync(FakePage())
+    assert "columns" not in dom
+    assert len(dom["nodes"]) == 2
+    assert dom["nodes"][0] == {
+        "node_id": "0000000a",
+        "tag": "button",
+        "text": "Sign Up",
+        "aria_label": None,
+        "attributes": {"id": None, "class": "btn", "name": None, "role": None,
+                       "type": "submit", "placeholder": None, "href": None,
+                       "data-testid": "signup"},
+        "xpath": "/html[1]/body[1]/button[1]",
+        "bounding_box": {"x": 10, "y": 20, "w": 100, "h": 30},
+        "visible": True,
+        "candidates": [{"type": "css", "value": "[data-testid=\"signup\"]",
+                        "prov": "data-attr", "score": 0.95}],
+    }
+    assert dom["nodes"][-1]["candidates"][1]["value"] == "[name=\"email\"]"
+
+
+def test_node_table_rows_are_lazy_and_stable():
+    """Rows are built on access, reused, and slices/iteration work like a list."""
+    nodes = NodeTable(make_payload()["columns"])
+    assert nodes._rows == [None, None]
+    assert nodes[1] is nodes[1]
+    assert nodes._rows[0] is None
+    assert [n["tag"] for n in nodes] == ["button", "input"]
+    assert nodes[:1] == [nodes[0]]
+    assert nodes.column("node_id") == ["0000000a", "0000000b"]
+
+
+def test_node_ids_reads_column():
+    """IDs come from the column for NodeTables and from dicts otherwise."""
+    dom = extract_dom_sync(FakePage())
+    assert node_ids(dom) == ["0000000a", "0000000b"]
+    assert dom["nodes"]._rows == [None, None]
+    assert node_ids({"nodes": [{"node_id": "x"}, {}]}) == ["x", ""]
+    assert node_ids({}) == []
+
+
+class FakeCDP:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, method, params):
+        self.sent.append((method, params))
+        return {"result": {"value": ["0000000a"]}}
+
+
+def test_extract_node_ids_over_cdp():
+    """Only the ID column is requested from the page."""
+    cdp = FakeCDP()
+    assert asyncio.run(extract_node_ids(None, cdp)) == ["0000000a"]
+    assert cdp.sent[0][1]["expression"] == NODE_IDS_EXPR
+    assert NODE_IDS_EXPR.endswith(".columns.node_id)()")
+
+
+def run_node_id(keys):
+    """Hash keys with NODE_ID_JS under Node, as the page would."""
+    script = f"const nodeId = {NODE_ID_JS};\nconsole.log(JSON.stringify({json.dumps(keys)}.map(nodeId)));"
+    out = subprocess.run(["node"], input=script, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_distinct_nodes_get_distinct_ids():
+    """IDs are 64-bit and don't collide across many similar nodes."""
+    a, b = run_node_id(["button|Sign Up|10|20", "button|Sign Up|10|21"])
+    assert a != b
+    assert len(a) == 16 and int(a, 16) >= 0
+
+    keys = [f"div|Item {i % 50}|{i % 97}|{i // 97}" for i in range(20000)]
+    ids = run_node_id(keys)
+    assert len(set(ids)) == len(set(keys))
+    assert run_node_id(keys[:1]) == ids[:1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
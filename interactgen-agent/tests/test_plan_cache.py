@@ -0,0 +1,67 @@
+"""
+Unit tests for the on-disk plan cache.
+"""
+import os
+import pytest
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.plan_cache import PlanCache, plan_cache_key
+
+
+def test_roundtrip(tmp_path):
+    """Stored plans are read back from disk."""
+    cache = PlanCache(str(tmp_path))
+    key = plan_cache_key("q", "http://x", "model", 1, [{"tag": "a"}])
+    assert cache.get(key) is None
+
+    steps = [{"step_id": "s1", "action": "click", "target": "Login"}]
+    cache.put(key, steps)
+    assert cache.get(key) == steps
+    assert PlanCache(str(tmp_path)).get(key) == steps
+
+
+def test_key_depends_on_inputs():
+    """Any change in the planner inputs produces a different key."""
+    base = plan_cache_key("q", "u", "m", 1, [])
+    assert base == plan_cache_key("q", "u", "m", 1, [])
+    assert base != plan_cache_key("q", "u", "m", 2, [])
+    assert base != plan_cache_key("q", "u", "m", 1, [{"tag": "a"}])
+    assert plan_cache_key("q", {"b": 1, "a": 2}) == plan_cache_key("q", {"a": 2, "b": 1})
+
+
+def test_evicts_least_recently_used(tmp_path):
+    """Entries beyond max_entries are dropped oldest first."""
+    cache = PlanCache(str(tmp_path), max_entries=2)
+    cache.put("a", [1])
+    os.utime(tmp_path / "a.json", (1, 1))
+    cache.put("b", [2])
+    os.utime(tmp_path / "b.json", (2, 2))
+    cache.get("a")  # Touch 'a' so 'b' becomes the LRU entry
+    cache.put("c", [3])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == [1]
+    assert len(cache) == 2
+
+
+def test_entries_expire(tmp_path):
+    """Entries older than max_age_sec are dropped, even if recently hit."""
+    cache = PlanCache(str(tmp_path), max_age_sec=60)
+    cache.put("a", [1])
+    assert cache.get("a") == [1]
+
+    entry = tmp_path / "a.json"
+    entry.write_bytes(entry.read_bytes().replace(b'"created":', b'"created":1,"old":'))
+    assert cache.get("a") is None
+    assert not entry.exists()
+
+
+def test_legacy_entries_are_ignored(tmp_path):
+    """Files from before entries carried a creation time read as misses."""
+    (tmp_path / "a.json").write_bytes(b'[{"action": "click"}]')
+    assert PlanCache(str(tmp_path)).get("a") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,157 @@
+"""
+Unit tests for planner response handling.
+"""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.planner.planner_agent as planner_agent
+from src.planner.planner_agent import interactive_index, plan_next_step, strip_code_fence
+
+
+def test_strip_code_fence():
+    """Fenced JSON is unwrapped; bare JSON is returned unchanged."""
+    assert strip_code_fence('[{"a": 1}]') == '[{"a": 1}]'
+    assert strip_code_fence('```json\n[1]\n```') == '[1]'
+    assert strip_code_fence('Steps:\n```\n[1]\n```') == '[1]'
+    # A json-tagged block wins over an earlier untagged one
+    assert strip_code_fence('``` x ``` ```json [2] ```') == '[2]'
+
+
+def test_interactive_index_is_stored_on_snapshot():
+    """The planner index covers the first 20 nodes and is built once."""
+    nodes = [{"tag": "div", "text": "x"}] * 19 + [
+        {"tag": "button", "text": "Go", "aria_label": None},
+        {"tag": "a", "text": "Too late"},
+    ]
+    snapshot = {"nodes": nodes}
+    index = interactive_index(snapshot)
+    assert index == [{"tag": "button", "text": "Go", "aria": ""}]
+    assert interactive_index(snapshot) is index
+
+
+def test_plan_cache_failure_is_not_retried(monkeypatch, tmp_path):
+    """A cache directory that can't be created is only tried once."""
+    attempts = []
+
+    def broken(path, **kwargs):
+        attempts.append(path)
+        raise OSError("read-only")
+
+    monkeypatch.setattr(planner_agent, "PLAN_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(planner_agent, "_plan_cache", None)
+    monkeypatch.setattr(planner_agent, "PlanCache", broken)
+    assert planner_agent._get_plan_cache() is None
+    assert planner_agent._get_plan_cache() is None
+    assert len(attempts) == 1
+
+
+class FakeStream:
+    """Streamed completion that yields `content` a few characters at a time."""
+
+    def __init__(self, content, size=4):
+        self.parts = [content[i:i + size] for i in range(0, len(content), size)]
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        for part in self.parts:
+            self.read += 1
+            delta = type("D", (), {"content": part})
+            yield type("Chunk", (), {"choices": [type("C", (), {"delta": delta})]})
+
+    def close(self):
+        self.closed = True
+
+
+class FakeGroq:
+    """Stands in for the Groq client and counts completions."""
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+        self.sent = []
+        self.streams = []
+        self.chat = self.completions = self
+
+    def create(self, **kwargs):
+        self.calls += 1
+        self.sent.append(kwargs["messages"][1]["content"])
+        if kwargs.get("stream"):
+            self.streams.append(FakeStream(self.content))
+            return self.streams[-1]
+        message = type("M", (), {"content": self.content})
+        choice = type("C", (), {"message": message})
+        return type("R", (), {"choices": [choice]})
+
+
+def test_plan_next_step_reuses_identical_requests(monkeypatch):
+    """Identical page + history skips the API and gets a fresh step_id."""
+    fake = FakeGroq('{"action": "click", "element_id": "n1", "target": "Go"}')
+    monkeypatch.setattr(planner_agent, "_get_client", lambda key: fake)
+    monkeypatch.setattr(planner_agent, "_STEP_CACHE", type(planner_agent._STEP_CACHE)())
+    dom = {"nodes": [{"node_id": "n1", "tag": "button", "text": "Go"}]}
+
+    first = plan_next_step("go", "http://x", dom, [], api_key="k")
+    first["target"] = "mutated"
+    second = plan_next_step("go", "http://x", dom, [{"step": first, "result": {}}], api_key="k")
+    third = plan_next_step("go", "http://x", dom, [], api_key="k")
+
+    assert fake.calls == 2  # The history changed for the second call
+    assert third == {"action": "click", "element_id": "n1", "target": "Go", "step_id": "s1"}
+    assert second["step_id"] == "s2"
+
+
+def test_plan_next_step_resamples_after_a_failed_step(monkeypatch):
+    """A retry after a failed or no-op step never gets the cached answer."""
+    fake = FakeGroq('{"action": "click", "element_id": "n1", "target": "Go"}')
+    monkeypatch.setattr(planner_agent, "_get_client", lambda key: fake)
+    monkeypatch.setattr(planner_agent, "_STEP_CACHE", type(planner_agent._STEP_CACHE)())
+    dom = {"nodes": [{"node_id": "n1", "tag": "button", "text": "Go"}]}
+    step = {"action": "click", "target": "Go"}
+
+    failed = [{"step": step, "result": {"ok": False, "message": "timeout"}}]
+    plan_next_step("go", "http://x", dom, failed, api_key="k")
+    plan_next_step("go", "http://x", dom, failed, api_key="k")
+    assert fake.calls == 2
+
+    no_op = [{"step": step, "result": {"ok": True, "no_op": True, "message": "Clicked"}}]
+    plan_next_step("go", "http://x", dom, no_op, api_key="k")
+    plan_next_step("go", "http://x", dom, no_op, api_key="k")
+    assert fake.calls == 4
+    assert len(planner_agent._STEP_CACHE) == 0
+
+
+def test_plan_next_step_stops_reading_after_the_object(monkeypatch):
+    """Trailing tokens after the step object are never consumed."""
+    fake = FakeGroq('```json\n{"action": "type", "value": "a}b"}\n```\nDone, that is the step.')
+    monkeypatch.setattr(planner_agent, "_get_client", lambda key: fake)
+    dom = {"nodes": [{"node_id": "n1", "tag": "input"}]}
+
+    step = plan_next_step("type", "http://stream", dom, [], api_key="k")
+
+    assert step == {"action": "type", "value": "a}b", "step_id": "s1"}
+    stream = fake.streams[0]
+    assert stream.closed and stream.read < len(stream.parts)
+
+
+def test_plan_next_step_prioritizes_elements(monkeypatch):
+    """Late buttons beat early filler divs, and the list stays in page order."""
+    fake = FakeGroq('{"action": "done"}')
+    monkeypatch.setattr(planner_agent, "_get_client", lambda key: fake)
+    filler = [{"node_id": f"d{i}", "tag": "div", "text": f"filler text {i}"} for i in range(200)]
+    dom = {"nodes": [{"node_id": "top", "tag": "a", "text": "Home"}] + filler + [
+        {"node_id": "buy", "tag": "button", "text": "Buy now"},
+    ]}
+
+    plan_next_step("buy it", "http://x", dom, [], api_key="k")
+    elements = fake.sent[0].split("Els:\n")[1].rsplit("\nNext", 1)[0]
+    listed = [line.split("]")[0][4:] for line in elements.splitlines()]
+
+    assert listed[0] == "top" and listed[-1] == "buy"
+    assert len(elements) <= planner_agent.ELEMENT_CONTEXT_CHARS
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
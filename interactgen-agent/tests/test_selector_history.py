@@ -0,0 +1,59 @@
+"""
+Unit tests for selector history batching.
+"""
+import json
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.utils.selector_history as selector_history
+from src.utils.selector_history import (
+    SelectorHistory, SelectorHistoryBatch, get_boost_score, run_with_success_counts,
+)
+
+
+def test_batch_writes_once(tmp_path, monkeypatch):
+    """Updates inside a batch are flushed with a single save on exit."""
+    history = SelectorHistory(str(tmp_path / "history.json"))
+    saves = []
+    original = history._save
+    monkeypatch.setattr(history, "_save", lambda: (saves.append(1), original()))
+
+    with SelectorHistoryBatch(history) as batch:
+        batch.record("n1", "#a", False)
+        history.update_success("n1", "#a", True)
+        with SelectorHistoryBatch(history):
+            batch.record("n2", "#b", True)
+        assert saves == []
+
+    assert saves == [1]
+    data = json.loads((tmp_path / "history.json").read_text())
+    assert data["n1:#a"]["success_count"] == 1
+    assert data["n1:#a"]["failure_count"] == 1
+    assert data["n2:#b"]["success_count"] == 1
+
+
+def test_unbatched_updates_save_immediately(tmp_path):
+    """Outside a batch every update still reaches the file."""
+    path = tmp_path / "history.json"
+    history = SelectorHistory(str(path))
+    history.update_success("n1", "#a", True)
+    assert json.loads(path.read_text())["n1:#a"]["success_count"] == 1
+
+
+def test_frozen_counts_ignore_later_updates(tmp_path, monkeypatch):
+    """Lookups inside run_with_success_counts see only the frozen counts."""
+    history = SelectorHistory(str(tmp_path / "history.json"))
+    monkeypatch.setattr(selector_history, "_history", history)
+    frozen = selector_history.success_counts()
+    history.update_success("n1", "#a", True)
+
+    assert get_boost_score("n1", "#a") == selector_history.HISTORY_BOOST
+    assert run_with_success_counts(frozen, get_boost_score, "n1", "#a") == 0.0
+    # The override is only active during the call
+    assert get_boost_score("n1", "#a") == selector_history.HISTORY_BOOST
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
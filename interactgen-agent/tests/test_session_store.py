@@ -0,0 +1,107 @@
+"""
+Unit tests for the bounded session store.
+"""
+import orjson
+import pytest
+import sys
+import time
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.session_store import MAX_STEPS, SessionState, SessionStore
+
+
+def test_put_and_get():
+    """Stored sessions are returned by reference."""
+    store = SessionStore(max_sessions=16, segments=4)
+    session = {"session_id": "a", "steps": []}
+    store.put("a", session)
+
+    assert "a" in store
+    assert store.get("a") is session
+    assert store.get("missing") is None
+
+
+def test_evicts_least_recently_used():
+    """Each segment drops its oldest entry once over capacity."""
+    store = SessionStore(max_sessions=2, segments=1)
+    store.put("a", {})
+    store.put("b", {})
+    store.get("a")  # Touch 'a' so 'b' becomes the LRU entry
+    store.put("c", {})
+
+    assert "a" in store
+    assert "b" not in store
+    assert "c" in store
+    assert len(store) == 2
+
+
+def test_pop():
+    """Popped sessions are removed from the store."""
+    store = SessionStore()
+    store.put("a", {"x": 1})
+
+    assert store.pop("a") == {"x": 1}
+    assert "a" not in store
+
+
+def test_segments_must_be_power_of_two():
+    """Segment count is used as a bit mask."""
+    with pytest.raises(ValueError):
+        SessionStore(segments=3)
+
+
+def test_idle_sessions_expire():
+    """Entries idle past the TTL are dropped and reported to on_evict."""
+    evicted = []
+    store = SessionStore(segments=1, ttl_sec=0.05,
+                         on_evict=lambda sid, s: evicted.append(sid))
+    store.put("a", {})
+    store.put("b", {})
+    time.sleep(0.03)
+    assert store.touch("b")
+    time.sleep(0.03)
+
+    assert "a" not in store
+    assert store.get("b") is not None
+    store.put("c", {})
+    assert evicted == ["a"]
+
+
+def test_session_state_json():
+    """Incrementally encoded session matches the plain dict layout."""
+    state = SessionState(session_id="a", query="q", url="http://x", created_at="t")
+    state.add_message("user", "hi", "t")
+    step = {"action": "click", "target": "Login"}
+    state.add_step(step)
+    state.add_result({"ok": True, "message": "done"})
+    state.status = "completed"
+
+    assert orjson.loads(state.to_json()) == {
+        "session_id": "a",
+        "query": "q",
+        "url": "http://x",
+        "status": "completed",
+        "created_at": "t",
+        "messages": [{"role": "user", "content": "hi", "timestamp": "t"}],
+        "steps": [step],
+        "results": [{"ok": True, "message": "done"}],
+    }
+    assert not hasattr(state, "__dict__")
+
+
+def test_session_state_keeps_recent_steps():
+    """Old steps fall off the ring buffer and are counted."""
+    state = SessionState(session_id="a", query="q", url="u", created_at="t")
+    for i in range(MAX_STEPS + 5):
+        state.add_step({"action": "click", "target": str(i)})
+
+    data = orjson.loads(state.to_json())
+    assert len(data["steps"]) == MAX_STEPS
+    assert data["steps"][0]["target"] == "5"
+    assert data["steps_dropped"] == 5
+    assert "results_dropped" not in data
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,44 @@
+"""
+Unit tests for the byte-capped snapshot cache.
+"""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.snapshot_cache import SnapshotCache
+
+
+def test_get_returns_cached_snapshot():
+    """Cached snapshots are returned by reference."""
+    cache = SnapshotCache()
+    snap = {"url": "https://example.com", "nodes": []}
+    cache.put("k", snap)
+
+    assert cache.get("k") is snap
+    assert cache.get("missing") is None
+
+
+def test_evicts_oldest_when_over_budget():
+    """Total cached JSON size stays within max_bytes."""
+    snap = {"nodes": ["x" * 100]}
+    cache = SnapshotCache(max_bytes=250)
+    cache.put("a", snap)
+    cache.put("b", snap)
+    cache.put("c", snap)
+
+    assert cache.get("a") is None
+    assert cache.get("c") is snap
+    assert len(cache) == 2
+
+
+def test_skips_oversized_snapshot():
+    """A single snapshot larger than the budget is not cached."""
+    cache = SnapshotCache(max_bytes=10)
+    cache.put("big", {"nodes": ["x" * 100]})
+
+    assert len(cache) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])